@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Evolve Consciousness Engine - Answer Store
+Precomputed answers keyed by question and program level, tracked against the vectors they came from
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+ANSWER_STORE_PATH = os.getenv("ANSWER_STORE_PATH", "answer_store.db")
+# Failed re-warms of a stale answer before it is dropped
+ANSWER_REWARM_MAX_FAILURES = int(os.getenv("ANSWER_REWARM_MAX_FAILURES", "3"))
+
+
+def normalize_question(question: str) -> str:
+    """Case- and whitespace-insensitive cache key, ignoring trailing punctuation"""
+    return re.sub(r"\s+", " ", question.strip().lower()).rstrip("?!. ")
+
+
+def content_hash(text: str) -> str:
+    """Short fingerprint of a chunk's text, stored in vector metadata"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class AnswerStore:
+    """
+    SQLite-backed answer cache
+
+    Each answer records the namespaces, vector IDs and content hashes it was
+    generated from. When an upload rewrites one of those vectors with
+    different text, the answer is marked stale: it stops being served and is
+    queued for re-warming.
+    """
+
+    def __init__(self, path: str = ANSWER_STORE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS answers (
+                question_key TEXT NOT NULL,
+                program_level TEXT NOT NULL,
+                tenant TEXT NOT NULL DEFAULT '',
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                model TEXT,
+                created_at REAL NOT NULL,
+                stale INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (question_key, program_level, tenant)
+            );
+            CREATE TABLE IF NOT EXISTS answer_sources (
+                question_key TEXT NOT NULL,
+                program_level TEXT NOT NULL,
+                tenant TEXT NOT NULL DEFAULT '',
+                vector_id TEXT NOT NULL,
+                content_hash TEXT,
+                namespace TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_answer_sources_vector ON answer_sources (vector_id);
+        """)
+        # Stores created before these columns existed; sources without a namespace match any
+        added = {
+            "answers": "failures INTEGER NOT NULL DEFAULT 0",
+            "answer_sources": "namespace TEXT",
+        }
+        for table, column in added.items():
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if column.split()[0] not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+        self._conn.commit()
+
+    def get(self, question: str, program_level: str, tenant: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Fresh answer for this question, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer, sources, model, created_at FROM answers "
+                "WHERE question_key = ? AND program_level = ? AND tenant = ? AND stale = 0",
+                (normalize_question(question), program_level, tenant or "")
+            ).fetchone()
+        if row is None:
+            return None
+        return {"answer": row[0], "sources": json.loads(row[1]), "model": row[2], "created_at": row[3]}
+
+    def put(self, question: str, program_level: str, tenant: Optional[str], answer: str,
+            sources: List[Dict[str, Any]], dependencies: List[Tuple[str, str, Optional[str]]], model: str = ""):
+        """
+        Store an answer with the (namespace, vector_id, content_hash) triples it depends on
+        """
+        key = (normalize_question(question), program_level, tenant or "")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers "
+                "(question_key, program_level, tenant, question, answer, sources, model, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, question, answer, json.dumps(sources), model, time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM answer_sources WHERE question_key = ? AND program_level = ? AND tenant = ?", key
+            )
+            self._conn.executemany(
+                "INSERT INTO answer_sources "
+                "(question_key, program_level, tenant, vector_id, content_hash, namespace) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(*key, vector_id, digest, namespace) for namespace, vector_id, digest in dependencies]
+            )
+
+    def invalidate(self, namespace: str, vector_hashes: Dict[str, str]) -> int:
+        """
+        Mark answers stale whose source vectors now hold different text
+
+        Vector IDs are only unique within a namespace, so sources recorded
+        for another namespace are left alone.
+
+        Args:
+            namespace: namespace the vectors were just written to
+            vector_hashes: vector_id -> content_hash just written
+
+        Returns:
+            Number of answers newly marked stale
+        """
+        if not vector_hashes:
+            return 0
+
+        with self._lock, self._conn:
+            affected = set()
+            ids = list(vector_hashes)
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT question_key, program_level, tenant, vector_id, content_hash FROM answer_sources "
+                    f"WHERE vector_id IN ({','.join('?' * len(batch))}) AND (namespace = ? OR namespace IS NULL)",
+                    [*batch, namespace]
+                ).fetchall()
+                for question_key, program_level, tenant, vector_id, digest in rows:
+                    if digest != vector_hashes[vector_id]:
+                        affected.add((question_key, program_level, tenant))
+
+            marked = 0
+            for key in affected:
+                marked += self._conn.execute(
+                    "UPDATE answers SET stale = 1 WHERE question_key = ? AND program_level = ? AND tenant = ? "
+                    "AND stale = 0", key
+                ).rowcount
+        return marked
+
+    def stale_entries(self) -> List[Tuple[str, str, Optional[str]]]:
+        """(question, program_level, tenant) for every answer awaiting re-warm"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question, program_level, tenant FROM answers WHERE stale = 1"
+            ).fetchall()
+        return [(question, level, tenant or None) for question, level, tenant in rows]
+
+    def discard(self, entries: List[Tuple[str, str, Optional[str]]]) -> int:
+        """
+        Drop the answers for these (question, program_level, tenant) entries
+
+        Returns:
+            Number of answers dropped
+        """
+        keys = [(normalize_question(question), level, tenant or "") for question, level, tenant in entries]
+        with self._lock, self._conn:
+            return self._delete(keys)
+
+    def record_failures(self, entries: List[Tuple[str, str, Optional[str]]],
+                        max_failures: int = ANSWER_REWARM_MAX_FAILURES) -> int:
+        """
+        Count a failed re-warm against each stale answer, dropping those at max_failures
+
+        Returns:
+            Number of answers dropped
+        """
+        keys = [(normalize_question(question), level, tenant or "") for question, level, tenant in entries]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE answers SET failures = failures + 1 "
+                "WHERE question_key = ? AND program_level = ? AND tenant = ? AND stale = 1",
+                keys
+            )
+            exhausted = [
+                key for key in keys
+                if self._conn.execute(
+                    "SELECT 1 FROM answers WHERE question_key = ? AND program_level = ? AND tenant = ? "
+                    "AND stale = 1 AND failures >= ?", (*key, max_failures)
+                ).fetchone()
+            ]
+            return self._delete(exhausted)
+
+    def _delete(self, keys: List[Tuple[str, str, str]]) -> int:
+        dropped = 0
+        for key in keys:
+            dropped += self._conn.execute(
+                "DELETE FROM answers WHERE question_key = ? AND program_level = ? AND tenant = ?", key
+            ).rowcount
+            self._conn.execute(
+                "DELETE FROM answer_sources WHERE question_key = ? AND program_level = ? AND tenant = ?", key
+            )
+        return dropped
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            total, stale = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(stale), 0) FROM answers"
+            ).fetchone()
+        return {"answers": total, "stale": stale}
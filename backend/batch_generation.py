@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Evolve Consciousness Engine - Batch Answer Generation
+Offline generation of many Claude answers, via the Message Batches API or a local stand-in
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from rate_limit import anthropic_governor, estimate_tokens, PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+BATCH_GENERATION_MODE = os.getenv("BATCH_GENERATION_MODE", "local")  # local | anthropic
+BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "30"))
+LOCAL_BATCH_WORKERS = int(os.getenv("LOCAL_BATCH_WORKERS", "4"))
+
+
+class LocalBatchGenerator:
+    """
+    Runs batch requests as ordinary messages calls with bounded concurrency
+
+    Stand-in for the Batches API (development, tests, small warm-ups).
+    Calls go through the rate governor at background priority.
+    """
+
+    def __init__(self, client, model: str, max_workers: int = LOCAL_BATCH_WORKERS):
+        self.client = client
+        self.model = model
+        self.max_workers = max_workers
+
+    def _generate_one(self, request: Dict[str, Any]) -> str:
+        reserved = estimate_tokens(request["prompt"]) + request["max_tokens"]
+        anthropic_governor.acquire(tokens=reserved, priority=PRIORITY_BACKGROUND)
+        message = self.client.messages.create(
+            model=self.model,
+            max_tokens=request["max_tokens"],
+            messages=[{"role": "user", "content": request["prompt"]}]
+        )
+        anthropic_governor.settle(reserved, message.usage.input_tokens + message.usage.output_tokens)
+        return message.content[0].text
+
+    def generate(self, requests: List[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        Args:
+            requests: [{"custom_id": str, "prompt": str, "max_tokens": int}]
+
+        Returns:
+            custom_id -> answer text, for the requests that succeeded
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {request["custom_id"]: pool.submit(self._generate_one, request) for request in requests}
+            for custom_id, future in futures.items():
+                try:
+                    results[custom_id] = future.result()
+                except Exception as e:
+                    logger.error(f"Batch request {custom_id} failed: {e}")
+        return results
+
+
+class AnthropicBatchGenerator:
+    """
+    Submits requests through the Message Batches API and polls until done
+
+    Batches are billed at half price and have their own rate limits, so they
+    don't go through the governor. Results can take minutes to hours.
+    """
+
+    def __init__(self, client, model: str, poll_seconds: float = BATCH_POLL_SECONDS):
+        self.client = client
+        self.model = model
+        self.poll_seconds = poll_seconds
+
+    def generate(self, requests: List[Dict[str, Any]]) -> Dict[str, str]:
+        batch = self.client.beta.messages.batches.create(requests=[
+            {
+                "custom_id": request["custom_id"],
+                "params": {
+                    "model": self.model,
+                    "max_tokens": request["max_tokens"],
+                    "messages": [{"role": "user", "content": request["prompt"]}]
+                }
+            }
+            for request in requests
+        ])
+        logger.info(f"Submitted message batch {batch.id} ({len(requests)} requests)")
+
+        while batch.processing_status != "ended":
+            time.sleep(self.poll_seconds)
+            batch = self.client.beta.messages.batches.retrieve(batch.id)
+
+        results = {}
+        for entry in self.client.beta.messages.batches.results(batch.id):
+            if entry.result.type == "succeeded":
+                results[entry.custom_id] = entry.result.message.content[0].text
+            else:
+                logger.error(f"Batch request {entry.custom_id} {entry.result.type}")
+        return results
+
+
+def get_batch_generator(client, model: str):
+    """Batch generator selected by BATCH_GENERATION_MODE"""
+    if BATCH_GENERATION_MODE == "anthropic":
+        return AnthropicBatchGenerator(client, model)
+    return LocalBatchGenerator(client, model)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Evolve Consciousness Engine - Text Chunking
+Token-based overlapping chunker, for whole documents or streamed text
+"""
+
+import os
+from typing import Iterator, List
+
+import tiktoken
+
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+
+_encoding = None
+
+
+def get_encoding():
+    """Shared tiktoken encoding (loading it is expensive)"""
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.encoding_for_model("gpt-4")
+    return _encoding
+
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Split text into overlapping chunks"""
+    encoding = get_encoding()
+    tokens = encoding.encode(text)
+
+    chunks = []
+    start = 0
+
+    while start < len(tokens):
+        end = start + chunk_size
+        chunk_tokens = tokens[start:end]
+        chunk_text = encoding.decode(chunk_tokens)
+        chunks.append(chunk_text)
+        start += chunk_size - overlap
+
+    return chunks
+
+
+def split_for_workers(text: str, parts: int) -> List[str]:
+    """
+    Split text into roughly equal segments that tokenize independently
+
+    Cuts fall just after a newline that is followed by a non-space character,
+    where tiktoken's pre-tokenizer always starts a new token, so concatenating
+    the segments' tokens equals encoding the whole text.
+    """
+    if parts <= 1 or not text:
+        return [text]
+
+    segments = []
+    start = 0
+    target = len(text) // parts
+    for _ in range(parts - 1):
+        cut = start + target
+        while True:
+            cut = text.find("\n", cut)
+            if cut == -1 or cut + 1 >= len(text) or not text[cut + 1].isspace():
+                break
+            cut += 1
+        if cut == -1 or cut + 1 >= len(text):
+            break
+        segments.append(text[start:cut + 1])
+        start = cut + 1
+    segments.append(text[start:])
+    return segments
+
+
+def chunk_starts(token_count: int, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> range:
+    """Token offsets where chunk_text starts each chunk"""
+    return range(0, token_count, chunk_size - overlap)
+
+
+class StreamingChunker:
+    """
+    Incremental version of chunk_text for text that arrives in pieces
+
+    Only whole lines (or whole words, for very long lines) are tokenized, so
+    token boundaries line up with encoding the full text except for rare runs
+    of blank lines split across pieces. At most one chunk of tokens plus one
+    unfinished line is held in memory at a time.
+
+    take()/add_tokens() expose the two halves separately so the encoding can
+    happen elsewhere (e.g. a worker process); feed()/finish() do both locally.
+    """
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP):
+        self.chunk_size = chunk_size
+        self.step = chunk_size - overlap
+        self.pending = ""
+        self.tokens = []
+
+    def take(self, text: str) -> str:
+        """Add text and return the prefix that is now safe to encode"""
+        self.pending += text
+        cut = self.pending.rfind("\n") + 1
+        if cut == 0 and len(self.pending) > 4 * self.chunk_size:
+            # No newline in sight; fall back to the last space
+            cut = self.pending.rfind(" ")
+        if cut <= 0:
+            return ""
+
+        ready, self.pending = self.pending[:cut], self.pending[cut:]
+        return ready
+
+    def take_rest(self) -> str:
+        """Return whatever text is still pending (end of stream)"""
+        rest, self.pending = self.pending, ""
+        return rest
+
+    def add_tokens(self, tokens: List[int]) -> List[List[int]]:
+        """Add encoded tokens and return the token slices of every completed chunk"""
+        self.tokens.extend(tokens)
+        slices = []
+        while len(self.tokens) >= self.chunk_size:
+            slices.append(self.tokens[:self.chunk_size])
+            self.tokens = self.tokens[self.step:]
+        return slices
+
+    def finish_tokens(self) -> List[List[int]]:
+        """Return the token slices of the final (partial) chunks"""
+        slices = [self.tokens[start:start + self.chunk_size] for start in range(0, len(self.tokens), self.step)]
+        self.tokens = []
+        return slices
+
+    def feed(self, text: str) -> Iterator[str]:
+        """Add text and yield every chunk that is now complete"""
+        encoding = get_encoding()
+        ready = self.take(text)
+        if ready:
+            for tokens in self.add_tokens(encoding.encode(ready)):
+                yield encoding.decode(tokens)
+
+    def finish(self) -> Iterator[str]:
+        """Flush the remaining text, yielding the final (partial) chunks"""
+        encoding = get_encoding()
+        self.add_tokens(encoding.encode(self.take_rest()))
+        for tokens in self.finish_tokens():
+            yield encoding.decode(tokens)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Evolve Consciousness Engine - Request Deadlines
+Per-request time budget shared by the embedding, search and generation stages
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+# Stay well inside nginx's 60s proxy timeout
+QUERY_DEADLINE_SECONDS = float(os.getenv("QUERY_DEADLINE_SECONDS", "25"))
+
+
+class DeadlineExceeded(Exception):
+    """A stage ran out of time budget"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """
+    Time budget for one request
+
+    Each stage runs with whatever budget is left (optionally holding some
+    back for later stages), and its duration and any timeout are recorded
+    for the response metadata.
+    """
+
+    def __init__(self, budget_seconds: float = QUERY_DEADLINE_SECONDS):
+        self.budget = budget_seconds
+        self.expires = time.monotonic() + budget_seconds
+        self.stages_ms: Dict[str, float] = {}
+        self.timeouts: List[str] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    async def run(self, stage: str, func: Callable[..., Any], *args, reserve: float = 0.0,
+                  limit: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run blocking func(*args, timeout=..., **kwargs) in the threadpool within the budget
+
+        Args:
+            stage: Name reported in timings and timeouts
+            reserve: Seconds to hold back for the stages after this one
+            limit: Upper bound for this stage regardless of remaining budget
+
+        Raises:
+            DeadlineExceeded: If the stage times out (func raising TimeoutError counts too)
+        """
+        timeout = self.remaining() - reserve
+        if limit is not None:
+            timeout = min(timeout, limit)
+        if timeout <= 0:
+            self.timeouts.append(stage)
+            raise DeadlineExceeded(stage)
+
+        started = time.monotonic()
+        try:
+            # func gets the timeout too so its client call can give up on its own;
+            # wait_for is the backstop if it doesn't
+            return await asyncio.wait_for(run_in_threadpool(func, *args, timeout=timeout, **kwargs), timeout)
+        except TimeoutError:
+            self.timeouts.append(stage)
+            raise DeadlineExceeded(stage)
+        finally:
+            self.stages_ms[stage] = round((time.monotonic() - started) * 1000, 1)
+
+    def skip(self, stage: str):
+        """Record a stage that wasn't attempted for lack of time"""
+        self.timeouts.append(stage)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "budget_ms": round(self.budget * 1000),
+            "remaining_ms": round(self.remaining() * 1000),
+            "stages_ms": self.stages_ms,
+            "timeouts": self.timeouts,
+        }
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Evolve Consciousness Engine - Near-Duplicate Detection
+MinHash signatures with a persistent LSH index, so repeated passages aren't embedded twice
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+DEDUP_POLICY = os.getenv("DEDUP_POLICY", "reuse")  # off | reuse | skip
+DEDUP_INDEX_PATH = os.getenv("DEDUP_INDEX_PATH", "dedup_index.db")
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+SHINGLE_WORDS = int(os.getenv("DEDUP_SHINGLE_WORDS", "3"))
+
+# Changing these invalidates every stored signature
+NUM_PERM = 128
+LSH_BANDS = 16  # 16 bands x 8 rows: candidates from roughly 0.7 similarity up
+_ROWS = NUM_PERM // LSH_BANDS
+_PRIME = np.uint64((1 << 61) - 1)
+_MASK = np.uint64(0xFFFFFFFF)
+_random = np.random.RandomState(1)
+_PERM_A = _random.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _random.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """
+    MinHash signature over word shingles, ignoring case and punctuation
+
+    Returns None for text without words.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+    # Universal hashing; uint64 wrap-around is deterministic, which is all the permutations need
+    with np.errstate(over="ignore"):
+        permuted = ((hashes[:, None] * _PERM_A + _PERM_B) % _PRIME) & _MASK
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(a == b))
+
+
+def _band_keys(signature: np.ndarray) -> List[Tuple[int, int]]:
+    return [
+        (band, int.from_bytes(hashlib.blake2b(signature[band * _ROWS:(band + 1) * _ROWS].tobytes(),
+                                              digest_size=8).digest(), "little", signed=True))
+        for band in range(LSH_BANDS)
+    ]
+
+
+class DedupIndex:
+    """
+    SQLite-backed LSH index of chunk signatures
+
+    Chunks are keyed by (namespace, vector_id): vector IDs are only unique
+    within a namespace, and the same passage stored at two levels is exactly
+    what should match. Only canonical chunks (first seen) are bucketed, so
+    every match points at a chunk whose embedding is actually stored.
+    Duplicates are recorded with a back-reference to their canonical chunk.
+    """
+
+    def __init__(self, path: str = DEDUP_INDEX_PATH, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._upgrade_schema()
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                vector_id TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                duplicate_of TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (namespace, vector_id)
+            );
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                namespace TEXT NOT NULL,
+                vector_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_lsh_buckets ON lsh_buckets (band, bucket);
+            CREATE INDEX IF NOT EXISTS idx_lsh_buckets_vector ON lsh_buckets (namespace, vector_id);
+            CREATE INDEX IF NOT EXISTS idx_chunks_duplicate_of ON chunks (duplicate_of);
+        """)
+
+    def _upgrade_schema(self):
+        """Re-key an index created when chunks were keyed by vector_id alone"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(lsh_buckets)")}
+        if not columns or "namespace" in columns:
+            return
+        self._conn.executescript("""
+            BEGIN;
+            ALTER TABLE chunks RENAME TO chunks_by_id;
+            ALTER TABLE lsh_buckets RENAME TO lsh_buckets_by_id;
+            DROP INDEX IF EXISTS idx_lsh_buckets;
+            DROP INDEX IF EXISTS idx_lsh_buckets_vector;
+            DROP INDEX IF EXISTS idx_chunks_duplicate_of;
+            CREATE TABLE chunks (
+                vector_id TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                duplicate_of TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (namespace, vector_id)
+            );
+            CREATE TABLE lsh_buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                namespace TEXT NOT NULL,
+                vector_id TEXT NOT NULL
+            );
+            INSERT INTO chunks SELECT vector_id, namespace, signature, duplicate_of, created_at FROM chunks_by_id;
+            INSERT INTO lsh_buckets
+                SELECT b.band, b.bucket, c.namespace, b.vector_id
+                FROM lsh_buckets_by_id b JOIN chunks_by_id c ON c.vector_id = b.vector_id;
+            DROP TABLE chunks_by_id;
+            DROP TABLE lsh_buckets_by_id;
+            COMMIT;
+        """)
+
+    def find(self, signature: np.ndarray, exclude: Optional[Tuple[str, str]] = None
+             ) -> Optional[Tuple[str, str, float]]:
+        """
+        Most similar canonical chunk at or above the threshold
+
+        Args:
+            exclude: (namespace, vector_id) of the chunk being matched, so a
+                re-upload doesn't match its own earlier copy
+
+        Returns:
+            (vector_id, namespace, similarity), or None
+        """
+        keys = _band_keys(signature)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT c.vector_id, c.namespace, c.signature FROM lsh_buckets b "
+                "JOIN chunks c ON c.namespace = b.namespace AND c.vector_id = b.vector_id WHERE "
+                + " OR ".join(["(b.band = ? AND b.bucket = ?)"] * len(keys)),
+                [value for key in keys for value in key]
+            ).fetchall()
+
+        best = None
+        for vector_id, namespace, blob in rows:
+            if (namespace, vector_id) == exclude:
+                continue  # Re-upload of the same chunk
+            score = similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if score >= self.threshold and (best is None or score > best[2]):
+                best = (vector_id, namespace, score)
+        return best
+
+    def match_batch(self, vector_ids: Sequence[str], signatures: Sequence[Optional[np.ndarray]],
+                    namespace: str) -> List[Optional[Tuple[str, str, float]]]:
+        """
+        find() for a batch of chunks, also matching earlier chunks of the same batch
+
+        Nothing is recorded; call add() once the batch is stored.
+        """
+        matches = []
+        pending = []  # (vector_id, signature) of canonical chunks earlier in this batch
+        for vector_id, signature in zip(vector_ids, signatures):
+            if signature is None:
+                matches.append(None)
+                continue
+            best = self.find(signature, exclude=(namespace, vector_id))
+            for pending_id, pending_signature in pending:
+                score = similarity(signature, pending_signature)
+                if score >= self.threshold and (best is None or score > best[2]):
+                    best = (pending_id, namespace, score)
+            if best is None:
+                pending.append((vector_id, signature))
+            matches.append(best)
+        return matches
+
+    def add(self, records: Sequence[Tuple[str, str, np.ndarray, Optional[str]]]):
+        """
+        Record stored or skipped chunks
+
+        Args:
+            records: (vector_id, namespace, signature, duplicate_of) tuples;
+                duplicate_of is None for canonical chunks
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?)",
+                [(vector_id, namespace, signature.tobytes(), duplicate_of, now)
+                 for vector_id, namespace, signature, duplicate_of in records]
+            )
+            # A re-uploaded chunk's text may have changed; re-bucket it
+            self._conn.executemany(
+                "DELETE FROM lsh_buckets WHERE namespace = ? AND vector_id = ?",
+                [(namespace, vector_id) for vector_id, namespace, _, _ in records]
+            )
+            self._conn.executemany(
+                "INSERT INTO lsh_buckets VALUES (?, ?, ?, ?)",
+                [(band, bucket, namespace, vector_id)
+                 for vector_id, namespace, signature, duplicate_of in records if duplicate_of is None
+                 for band, bucket in _band_keys(signature)]
+            )
+
+    def known_ids(self, namespace: str, vector_ids: Sequence[str]) -> Set[str]:
+        """The subset of vector_ids seen in this namespace at an earlier upload"""
+        found = set()
+        ids = list(vector_ids)
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                found.update(row[0] for row in self._conn.execute(
+                    f"SELECT vector_id FROM chunks WHERE namespace = ? "
+                    f"AND vector_id IN ({','.join('?' * len(batch))})", [namespace, *batch]
+                ))
+        return found
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total, duplicates = self._conn.execute(
+                "SELECT COUNT(*), COUNT(duplicate_of) FROM chunks"
+            ).fetchone()
+        return {"policy": DEDUP_POLICY, "threshold": self.threshold, "chunks": total, "duplicates": duplicates}
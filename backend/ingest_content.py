@@ -9,9 +9,11 @@ import json
 import os
 import time
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterator
 import argparse
 
+READ_SIZE = 64 * 1024  # Bytes per piece when streaming files
+
 
 class ContentIngester:
     """Handles batch ingestion of content into Evolve"""
@@ -68,8 +70,57 @@ class ContentIngester:
             })
             return False
     
+    def ingest_file_streaming(self, file_path: Path, program_level: str = "beginner",
+                              use_ai_tagging: bool = False) -> bool:
+        """Ingest a single file by streaming it to /upload/stream without reading it into memory"""
+        def read_pieces() -> Iterator[bytes]:
+            with open(file_path, 'rb') as f:
+                while piece := f.read(READ_SIZE):
+                    yield piece
+        
+        try:
+            params = {
+                "title": file_path.stem,
+                "source": str(file_path),
+                "program_level": program_level,
+                "use_ai_tagging": use_ai_tagging
+            }
+            
+            # A generator body is sent with chunked transfer encoding
+            print(f"  Streaming: {file_path.name}...", end=" ")
+            response = requests.post(
+                f"{self.api_url}/upload/stream",
+                params=params,
+                data=read_pieces(),
+                headers={"Content-Type": "text/plain; charset=utf-8"},
+                timeout=600
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                print(f"✓ ({result['chunks_created']} chunks)")
+                self.stats["success"] += 1
+                return True
+            else:
+                print(f"✗ Error: {response.status_code}")
+                self.stats["failed"] += 1
+                self.stats["errors"].append({
+                    "file": str(file_path),
+                    "error": response.text
+                })
+                return False
+                
+        except Exception as e:
+            print(f"✗ Exception: {str(e)}")
+            self.stats["failed"] += 1
+            self.stats["errors"].append({
+                "file": str(file_path),
+                "error": str(e)
+            })
+            return False
+    
     def ingest_directory(self, directory: Path, program_level: str = "beginner", 
-                        use_ai_tagging: bool = False, pattern: str = "*.md"):
+                        use_ai_tagging: bool = False, pattern: str = "*.md", stream: bool = False):
         """Ingest all files in a directory"""
         files = list(directory.glob(pattern))
         self.stats["total"] = len(files)
@@ -77,11 +128,13 @@ class ContentIngester:
         print(f"\n📚 Found {len(files)} files to ingest")
         print(f"📁 Directory: {directory}")
         print(f"🎯 Program Level: {program_level}")
-        print(f"🤖 AI Tagging: {'Enabled' if use_ai_tagging else 'Disabled'}\n")
+        print(f"🤖 AI Tagging: {'Enabled' if use_ai_tagging else 'Disabled'}")
+        print(f"🌊 Streaming: {'Enabled' if stream else 'Disabled'}\n")
         
+        ingest = self.ingest_file_streaming if stream else self.ingest_file
         for i, file_path in enumerate(files, 1):
             print(f"[{i}/{len(files)}]", end=" ")
-            self.ingest_file(file_path, program_level, use_ai_tagging)
+            ingest(file_path, program_level, use_ai_tagging)
             time.sleep(0.5)  # Rate limiting
         
         self.print_summary()
@@ -113,6 +166,8 @@ def main():
                        help="File pattern to match (default: *.md)")
     parser.add_argument("--ai-tagging", action="store_true",
                        help="Enable AI-enhanced tagging (slower but more accurate)")
+    parser.add_argument("--stream", action="store_true",
+                       help="Stream files to the server instead of reading them into memory (large transcripts)")
     parser.add_argument("--api-url", type=str, default="http://localhost:8000",
                        help="API URL (default: http://localhost:8000)")
     
@@ -142,7 +197,8 @@ def main():
         directory=directory,
         program_level=args.level,
         use_ai_tagging=args.ai_tagging,
-        pattern=args.pattern
+        pattern=args.pattern,
+        stream=args.stream
     )
 
 
@@ -8,19 +8,44 @@ from dotenv import load_dotenv
 import os
 load_dotenv(override=True)  # Override system environment variables
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import codecs
+import json
 import logging
 
 # Import our modules
 from pinecone import Pinecone, ServerlessSpec
-from openai import OpenAI
-from anthropic import Anthropic
-import tiktoken
-from tagging import generate_tags
+from openai import OpenAI, APITimeoutError as OpenAITimeoutError
+from anthropic import Anthropic, APITimeoutError as AnthropicTimeoutError
+from urllib3.exceptions import MaxRetryError, TimeoutError as Urllib3TimeoutError
+from tagging import generate_tags, question_tags
+from chunking import StreamingChunker, chunk_starts, CHUNK_SIZE
+from workers import (
+    CPU_WORKERS, run_cpu, encode_text, encode_parallel, decode_and_tag,
+    get_cpu_executor, shutdown_cpu_executor
+)
+from retrieval import mmr_rerank, drop_duplicates
+from namespaces import (
+    namespace_for, query_plan, merge_matches, check_scope, InvalidNamespace, NamespaceCatalog, PROGRAM_LEVELS
+)
+from answer_store import AnswerStore, content_hash
+from dedup import DedupIndex, DEDUP_POLICY
+from batch_generation import get_batch_generator
+from deadline import Deadline, DeadlineExceeded, QUERY_DEADLINE_SECONDS
+from profiling import PROFILING_ENABLED, ProfilingMiddleware, list_profiles, profile_path
+from rate_limit import (
+    openai_governor, anthropic_governor, estimate_tokens, get_rate_limit_stats,
+    PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND, RateLimitTimeout
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -36,9 +61,44 @@ index = None
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "evolve-consciousness")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
 CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-sonnet-4-5-20250929")
-CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
-CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
 PINECONE_DIMENSION = int(os.getenv("PINECONE_DIMENSION", "1536"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "1000"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+# Searches in flight per batch; each holds a threadpool thread shared with live /query calls
+BATCH_SEARCH_CONCURRENCY = int(os.getenv("BATCH_SEARCH_CONCURRENCY", "4"))
+MMR_ENABLED = os.getenv("MMR_ENABLED", "true").lower() == "true"
+MMR_FETCH_MULTIPLIER = int(os.getenv("MMR_FETCH_MULTIPLIER", "4"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+MMR_MAX_PER_DOCUMENT = int(os.getenv("MMR_MAX_PER_DOCUMENT", "0"))
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "64"))
+UPLOAD_READ_SIZE = int(os.getenv("UPLOAD_READ_SIZE", str(64 * 1024)))
+NAMESPACE_FANOUT_WORKERS = int(os.getenv("NAMESPACE_FANOUT_WORKERS", "16"))
+ANSWER_MAX_TOKENS = int(os.getenv("ANSWER_MAX_TOKENS", "2000"))
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_TOP_K = int(os.getenv("ANSWER_CACHE_TOP_K", "5"))
+GENERATION_MIN_SECONDS = float(os.getenv("GENERATION_MIN_SECONDS", "4"))
+GENERATION_TOKENS_PER_SECOND = float(os.getenv("GENERATION_TOKENS_PER_SECOND", "60"))
+GENERATION_RESERVE_SECONDS = float(os.getenv("GENERATION_RESERVE_SECONDS", "8"))
+SNIPPET_CHARS = int(os.getenv("SNIPPET_CHARS", "300"))
+AUTO_FILTER_ENABLED = os.getenv("AUTO_FILTER_ENABLED", "false").lower() == "true"
+AUTO_FILTER_MIN_CONFIDENCE = float(os.getenv("AUTO_FILTER_MIN_CONFIDENCE", "1.0"))
+AUTO_FILTER_MIN_MATCHES = int(os.getenv("AUTO_FILTER_MIN_MATCHES", "3"))
+
+# Concurrent per-namespace queries for cross-level fan-out
+namespace_executor = ThreadPoolExecutor(max_workers=NAMESPACE_FANOUT_WORKERS)
+namespace_catalog = NamespaceCatalog()
+
+# Precomputed answers for popular questions
+answer_store = AnswerStore() if ANSWER_CACHE_ENABLED else None
+warm_tasks = set()
+rewarm_lock = asyncio.Lock()
+
+# Near-duplicate chunks reuse an existing embedding or are skipped
+dedup_index = DedupIndex() if DEDUP_POLICY != "off" else None
+
+NO_MATCHES_ANSWER = "I couldn't find relevant information in the knowledge base to answer your question. Please try rephrasing or asking about a different topic."
+DEGRADED_ANSWER = "I couldn't put together a full answer in time. Here are the most relevant passages from the knowledge base:"
 
 
 @asynccontextmanager
@@ -78,6 +138,9 @@ async def lifespan(app: FastAPI):
         logger.info("Initializing Anthropic client...")
         anthropic_client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
         
+        # Spawn CPU workers now rather than on the first upload
+        get_cpu_executor()
+        
         logger.info("All services initialized successfully!")
         
         yield
@@ -87,6 +150,7 @@ async def lifespan(app: FastAPI):
         raise
     finally:
         logger.info("Shutting down...")
+        shutdown_cpu_executor()
 
 
 # Initialize FastAPI app
@@ -106,6 +170,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in request profiling (X-Profile: 1 header or PROFILE_SAMPLE_RATE)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 
 # === PYDANTIC MODELS ===
 
@@ -116,6 +184,7 @@ class UploadRequest(BaseModel):
     source: Optional[str] = None
     program_level: Optional[str] = "beginner"
     use_ai_tagging: Optional[bool] = False
+    tenant: Optional[str] = None
 
 
 class QueryRequest(BaseModel):
@@ -124,6 +193,31 @@ class QueryRequest(BaseModel):
     program_level: Optional[str] = None
     filters: Optional[Dict[str, Any]] = None
     top_k: Optional[int] = 5
+    mmr_lambda: Optional[float] = None  # 1.0 = pure relevance, 0.0 = pure diversity
+    max_per_document: Optional[int] = None
+    tenant: Optional[str] = None
+    deadline_seconds: Optional[float] = None  # Capped at QUERY_DEADLINE_SECONDS
+    auto_filter: Optional[bool] = None  # Pre-filter by tags detected in the question (default AUTO_FILTER_ENABLED)
+
+
+class BatchQueryRequest(BaseModel):
+    """Request model for batch RAG query"""
+    questions: List[str]
+    program_level: Optional[str] = None
+    filters: Optional[Dict[str, Any]] = None
+    top_k: Optional[int] = 5
+    mmr_lambda: Optional[float] = None  # 1.0 = pure relevance, 0.0 = pure diversity
+    max_per_document: Optional[int] = None
+    tenant: Optional[str] = None
+    generate_answers: Optional[bool] = True
+    max_concurrency: Optional[int] = 4
+
+
+class WarmRequest(BaseModel):
+    """Request model for answer cache warming"""
+    questions: List[str]
+    program_levels: Optional[List[str]] = None  # Default: every level
+    tenant: Optional[str] = None
 
 
 class QueryResponse(BaseModel):
@@ -135,39 +229,395 @@ class QueryResponse(BaseModel):
 
 # === HELPER FUNCTIONS ===
 
-def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
-    """Split text into overlapping chunks"""
-    encoding = tiktoken.encoding_for_model("gpt-4")
-    tokens = encoding.encode(text)
+def generate_embedding(text: str, priority: int = PRIORITY_INTERACTIVE, timeout: Optional[float] = None) -> List[float]:
+    """Generate embedding using OpenAI"""
+    return generate_embeddings([text], priority, timeout)[0]
+
+
+def generate_embeddings(texts: List[str], priority: int = PRIORITY_INTERACTIVE,
+                        timeout: Optional[float] = None) -> List[List[float]]:
+    """
+    Generate embeddings for many texts, EMBEDDING_BATCH_SIZE inputs per OpenAI request
+
+    With a timeout (seconds, per call), raises TimeoutError instead of
+    waiting on the rate governor or OpenAI any longer than that.
+    """
+    client = openai_client.with_options(timeout=timeout, max_retries=0) if timeout else openai_client
+    embeddings = []
+    try:
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            batch = texts[start:start + EMBEDDING_BATCH_SIZE]
+            openai_governor.acquire(tokens=sum(estimate_tokens(t) for t in batch), priority=priority, timeout=timeout)
+            response = client.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=batch
+            )
+            # Results carry their input index; don't rely on response ordering
+            embeddings.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+        return embeddings
+    except (OpenAITimeoutError, RateLimitTimeout) as e:
+        raise TimeoutError(str(e))
+    except Exception as e:
+        logger.error(f"Embedding generation failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Embedding generation failed: {str(e)}")
+
+
+def vector_id(title: str, chunk_index: int) -> str:
+    return f"{title.replace(' ', '_')}_{chunk_index}"
+
+
+def build_vector(chunk: str, embedding: List[float], tags: Dict[str, Any], title: str, source: Optional[str],
+                 program_level: Optional[str], chunk_index: int, total_chunks: Optional[int] = None,
+                 tenant: Optional[str] = None, duplicate_of: Optional[str] = None) -> Dict[str, Any]:
+    """Assemble the Pinecone record for one chunk"""
+    metadata = {
+        "text": chunk,
+        "title": title,
+        "source": source or "unknown",
+        "program_level": program_level,
+        "chunk_index": chunk_index,
+        "content_hash": content_hash(chunk),
+        "tags": tags.get("tags", []),
+        "detected_categories": tags.get("detected_categories", {}),
+        "primary_theme": tags.get("primary_theme", ""),
+        "consciousness_level": tags.get("consciousness_level", "")
+    }
+    # Streamed uploads don't know their length up front
+    if total_chunks is not None:
+        metadata["total_chunks"] = total_chunks
+    if tenant:
+        metadata["tenant"] = tenant
+    if duplicate_of:
+        metadata["duplicate_of"] = duplicate_of
     
-    chunks = []
-    start = 0
+    return {
+        "id": vector_id(title, chunk_index),
+        "values": embedding,
+        "metadata": metadata
+    }
+
+
+def upload_chunk_batch(chunks: List[str], keyword_tags: List[Dict[str, Any]], first_index: int, title: str,
+                       source: Optional[str], program_level: Optional[str], use_ai_tagging: bool = False,
+                       total_chunks: Optional[int] = None, tenant: Optional[str] = None,
+                       signatures: Optional[List[Any]] = None) -> Tuple[int, int]:
+    """
+    Embed, AI-tag (optionally) and upsert one batch of consecutive chunks
+    
+    With MinHash signatures, near-duplicates of already stored chunks are
+    handled per DEDUP_POLICY: "reuse" stores them with the canonical chunk's
+    embedding instead of embedding them again; "skip" doesn't store them at
+    all when the canonical chunk is in the same namespace, leaving only a
+    back-reference in the dedup index.
     
-    while start < len(tokens):
-        end = start + chunk_size
-        chunk_tokens = tokens[start:end]
-        chunk_text = encoding.decode(chunk_tokens)
-        chunks.append(chunk_text)
-        start += chunk_size - overlap
+    Returns:
+        (vectors_uploaded, duplicate_chunks)
+    """
+    namespace = namespace_for(program_level, tenant)
+    ids = [vector_id(title, first_index + i) for i in range(len(chunks))]
+    if dedup_index is not None and signatures is not None:
+        matches = dedup_index.match_batch(ids, signatures, namespace)
+    else:
+        matches = [None] * len(chunks)
     
-    return chunks
+    skipped = [
+        i for i, match in enumerate(matches)
+        if match and DEDUP_POLICY == "skip" and match[1] == namespace
+    ]
+    stored = [i for i in range(len(chunks)) if i not in skipped]
+    
+    # Canonical embeddings stored earlier are fetched; those in this batch are embedded below.
+    # Chunks are identified by (namespace, vector_id): IDs repeat across levels and tenants.
+    canonical = {i: (matches[i][1], matches[i][0]) for i in stored if matches[i]}
+    batch_canonicals = {(namespace, ids[i]) for i in stored if not matches[i]}
+    reused = {}
+    by_namespace = {}
+    for i, (canonical_namespace, canonical_id) in canonical.items():
+        if (canonical_namespace, canonical_id) not in batch_canonicals:
+            by_namespace.setdefault(canonical_namespace, set()).add(canonical_id)
+    for canonical_namespace, canonical_ids in by_namespace.items():
+        fetched = index.fetch(ids=list(canonical_ids), namespace=canonical_namespace).vectors
+        reused.update({(canonical_namespace, canonical_id): vector.values for canonical_id, vector in fetched.items()})
+    
+    # Chunks whose canonical vector is gone from the index are embedded after all
+    to_embed = [
+        i for i in stored
+        if i not in canonical or (canonical[i] not in batch_canonicals and canonical[i] not in reused)
+    ]
+    embeddings = dict(zip(to_embed, generate_embeddings([chunks[i] for i in to_embed], PRIORITY_BACKGROUND)))
+    reused.update({(namespace, ids[i]): embeddings[i] for i in to_embed})
+    
+    vectors = []
+    for i in stored:
+        duplicate_of = matches[i][0] if matches[i] and i not in embeddings else None
+        tags = keyword_tags[i]
+        if use_ai_tagging:
+            tags = generate_tags(chunks[i], use_ai=True, keyword_tags=tags)
+        vectors.append(build_vector(chunks[i], embeddings[i] if i in embeddings else reused[canonical[i]], tags,
+                                    title, source, program_level, first_index + i, total_chunks=total_chunks,
+                                    tenant=tenant, duplicate_of=duplicate_of))
+    if vectors:
+        index.upsert(vectors=vectors, namespace=namespace)
+        namespace_catalog.add(namespace)
+    
+    if skipped:
+        # A skipped chunk may have been stored by an earlier upload of this document
+        previous = dedup_index.known_ids(namespace, [ids[i] for i in skipped])
+        if previous:
+            index.delete(ids=list(previous), namespace=namespace)
+    
+    if answer_store is not None:
+        stale = answer_store.invalidate(namespace, {ids[i]: content_hash(chunks[i]) for i in range(len(chunks))})
+        if stale:
+            logger.info(f"Marked {stale} cached answers stale")
+    
+    if dedup_index is not None and signatures is not None:
+        dedup_index.add([
+            (ids[i], namespace, signatures[i], matches[i][0] if matches[i] and i not in embeddings else None)
+            for i in range(len(chunks)) if signatures[i] is not None
+        ])
+    
+    duplicates = len(chunks) - len(embeddings)
+    if duplicates:
+        logger.info(f"{duplicates} near-duplicate chunks: {len(skipped)} skipped, {duplicates - len(skipped)} reused")
+    return len(vectors), duplicates
 
 
-def generate_embedding(text: str) -> List[float]:
-    """Generate embedding using OpenAI"""
+async def document_token_batches(tokens: List[int]) -> AsyncIterator[List[List[int]]]:
+    """Yield a tokenized document's chunk token slices, UPLOAD_BATCH_SIZE chunks at a time"""
+    starts = chunk_starts(len(tokens))
+    for batch_start in range(0, len(starts), UPLOAD_BATCH_SIZE):
+        yield [tokens[start:start + CHUNK_SIZE] for start in starts[batch_start:batch_start + UPLOAD_BATCH_SIZE]]
+
+
+async def streamed_token_batches(data: AsyncIterator[bytes]) -> AsyncIterator[List[List[int]]]:
+    """Tokenize a document as its bytes arrive and yield chunk token slices in batches"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    chunker = StreamingChunker()
+    slices = []
+    
+    async for piece in data:
+        ready = chunker.take(decoder.decode(piece))
+        if ready:
+            slices.extend(chunker.add_tokens(await run_cpu(encode_text, ready)))
+        while len(slices) >= UPLOAD_BATCH_SIZE:
+            yield slices[:UPLOAD_BATCH_SIZE]
+            slices = slices[UPLOAD_BATCH_SIZE:]
+    
+    rest = chunker.take(decoder.decode(b"", final=True)) + chunker.take_rest()
+    if rest:
+        slices.extend(chunker.add_tokens(await run_cpu(encode_text, rest)))
+    slices.extend(chunker.finish_tokens())
+    for batch_start in range(0, len(slices), UPLOAD_BATCH_SIZE):
+        yield slices[batch_start:batch_start + UPLOAD_BATCH_SIZE]
+
+
+async def run_ingest_pipeline(token_batches: AsyncIterator[List[List[int]]], title: str, source: Optional[str],
+                              program_level: Optional[str], use_ai_tagging: bool = False,
+                              total_chunks: Optional[int] = None, tenant: Optional[str] = None) -> Tuple[int, int, int]:
+    """
+    Producer/consumer ingestion: CPU work in the process pool, I/O in the threadpool
+    
+    The producer submits decode + keyword tagging for each token batch to the
+    worker pool, keeping up to CPU_WORKERS batches in flight. The consumer
+    takes finished batches in order and embeds/upserts them, so tokenization
+    of later batches overlaps with the embedding calls of earlier ones.
+    
+    Returns:
+        (chunks_created, vectors_uploaded, duplicate_chunks)
+    """
+    in_flight = asyncio.Queue(maxsize=CPU_WORKERS)
+    
+    async def produce():
+        try:
+            async for token_slices in token_batches:
+                await in_flight.put(run_cpu(decode_and_tag, token_slices, dedup_index is not None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await in_flight.put(e)
+            return
+        await in_flight.put(None)
+    
+    producer = asyncio.create_task(produce())
+    chunks_created = 0
+    vectors_uploaded = 0
+    duplicate_chunks = 0
+    
+    try:
+        while (item := await in_flight.get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            chunks, keyword_tags, signatures = await item
+            uploaded, duplicates = await run_in_threadpool(
+                upload_chunk_batch, chunks, keyword_tags, chunks_created, title, source,
+                program_level, use_ai_tagging, total_chunks, tenant, signatures
+            )
+            chunks_created += len(chunks)
+            vectors_uploaded += uploaded
+            duplicate_chunks += duplicates
+    finally:
+        producer.cancel()
+    
+    return chunks_created, vectors_uploaded, duplicate_chunks
+
+
+async def ingest_stream(data: AsyncIterator[bytes], title: str, source: Optional[str],
+                        program_level: Optional[str], use_ai_tagging: bool = False,
+                        tenant: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Chunk, embed and upsert a document as its bytes arrive
+    
+    Chunks are flushed UPLOAD_BATCH_SIZE at a time, so memory stays bounded
+    by a few batches regardless of document size.
+    """
+    check_request_scope(program_level, tenant)
     try:
-        response = openai_client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=text
+        logger.info(f"Streaming document: {title}")
+        
+        chunks_created, vectors_uploaded, duplicate_chunks = await run_ingest_pipeline(
+            streamed_token_batches(data), title, source, program_level, use_ai_tagging, tenant=tenant
         )
-        return response.data[0].embedding
+        
+        logger.info(f"Successfully streamed {vectors_uploaded} vectors")
+        if answer_store is not None:
+            schedule_warm(rewarm_stale_answers())
+        
+        return {
+            "status": "success",
+            "message": f"Document '{title}' processed successfully",
+            "chunks_created": chunks_created,
+            "vectors_uploaded": vectors_uploaded,
+            "duplicate_chunks": duplicate_chunks
+        }
+        
     except Exception as e:
-        logger.error(f"Embedding generation failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Embedding generation failed: {str(e)}")
+        logger.error(f"Streaming upload failed: {e}")
+        raise HTTPException(status_code=500, detail=getattr(e, "detail", str(e)))
+
+
+def search_knowledge(embedding: List[float], top_k: int = 5, program_level: Optional[str] = None,
+                     filters: Optional[Dict[str, Any]] = None, mmr_lambda: Optional[float] = None,
+                     max_per_document: Optional[int] = None, tenant: Optional[str] = None,
+                     timeout: Optional[float] = None) -> List[Any]:
+    """
+    Run a Pinecone similarity search in the namespaces for this level/tenant
+    
+    Without a program level the search fans out to every level namespace of
+    the tenant (including levels outside PROGRAM_LEVELS that the index holds)
+    concurrently and the results are merged by score. With MMR enabled,
+    over-fetches top_k * MMR_FETCH_MULTIPLIER candidates with their values and
+    re-ranks them locally so overlapping neighbour chunks don't crowd the context.
+    A timeout (seconds) applies to each Pinecone request.
+    """
+    fetch_k = min(top_k * MMR_FETCH_MULTIPLIER, 1000) if MMR_ENABLED else top_k
+    request_options = {"_request_timeout": timeout} if timeout else {}
+    
+    def query_namespace(step: Dict[str, Any]) -> List[Any]:
+        try:
+            return index.query(
+                vector=embedding,
+                top_k=fetch_k,
+                include_metadata=True,
+                include_values=MMR_ENABLED,  # Pinecone caps top_k at 1000 when values are included
+                filter=step["filter"],
+                namespace=step["namespace"],
+                **request_options
+            ).matches
+        # Pinecone's client surfaces _request_timeout as urllib3 errors, not TimeoutError
+        except Urllib3TimeoutError as e:
+            raise TimeoutError(str(e))
+        except MaxRetryError as e:
+            if isinstance(e.reason, Urllib3TimeoutError):
+                raise TimeoutError(str(e))
+            raise
+    
+    known = namespace_catalog.names(index) if not program_level else ()
+    plan = query_plan(program_level, tenant, filters, known)
+    if len(plan) == 1:
+        candidates = query_namespace(plan[0])
+    else:
+        candidates = merge_matches(list(namespace_executor.map(query_namespace, plan)), fetch_k)
+    
+    candidates = drop_duplicates(candidates)
+    if not MMR_ENABLED:
+        return candidates[:top_k]
+    
+    return mmr_rerank(
+        embedding,
+        candidates,
+        top_k,
+        lambda_mult=MMR_LAMBDA if mmr_lambda is None else mmr_lambda,
+        max_per_document=MMR_MAX_PER_DOCUMENT if max_per_document is None else max_per_document
+    )
+
+
+def search_with_tag_filter(embedding: List[float], tags: List[str], top_k: int = 5,
+                           filters: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None,
+                           **kwargs) -> Tuple[List[Any], bool]:
+    """
+    search_knowledge restricted to chunks carrying any of tags
+    
+    Falls back to the unfiltered search when the filtered one finds fewer than
+    AUTO_FILTER_MIN_MATCHES (capped at top_k) matches.
+    
+    Returns:
+        (matches, fell_back)
+    """
+    if tags:
+        matches = search_knowledge(embedding, top_k, filters={**(filters or {}), "tags": {"$in": tags}},
+                                   timeout=timeout, **kwargs)
+        if len(matches) >= min(AUTO_FILTER_MIN_MATCHES, top_k):
+            return matches, False
+    return search_knowledge(embedding, top_k, filters=filters, timeout=timeout, **kwargs), bool(tags)
+
+
+def auto_filter_tags(request: QueryRequest) -> List[str]:
+    """High-confidence question tags to pre-filter by, if auto-filtering applies to this request"""
+    enabled = AUTO_FILTER_ENABLED if request.auto_filter is None else request.auto_filter
+    # An explicit tags filter from the caller wins
+    if not enabled or "tags" in (request.filters or {}):
+        return []
+    return sorted(question_tags(request.question, min_confidence=AUTO_FILTER_MIN_CONFIDENCE))
+
+
+def source_namespace(match: Any) -> str:
+    """Namespace that uploads of this match's document write to, so its cached answers go stale"""
+    metadata = match.metadata or {}
+    return namespace_for(metadata.get("program_level"), metadata.get("tenant"))
+
+
+def format_sources(matches: List[Any]) -> List[Dict[str, Any]]:
+    """Summarize Pinecone matches for API responses"""
+    return [
+        {
+            "title": match.metadata.get("title", "Unknown"),
+            "source": match.metadata.get("source", "Unknown"),
+            "score": match.score,
+            "tags": match.metadata.get("tags", [])
+        }
+        for match in matches
+    ]
+
+
+def format_snippets(matches: List[Any]) -> str:
+    """Numbered passages for a retrieval-only answer"""
+    passages = []
+    for number, match in enumerate(matches, 1):
+        text = " ".join(match.metadata.get("text", "").split())
+        if len(text) > SNIPPET_CHARS:
+            text = text[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "..."
+        passages.append(f"{number}. [{match.metadata.get('title', 'Unknown')}] {text}")
+    return "\n\n".join([DEGRADED_ANSWER, *passages])
 
 
-def generate_answer(question: str, context_chunks: List[Dict[str, Any]], program_level: str = "beginner") -> str:
-    """Generate answer using Claude with retrieved context"""
+def answer_token_budget(seconds: float) -> int:
+    """max_tokens Claude can be expected to produce in the time left"""
+    return max(1, min(ANSWER_MAX_TOKENS, int(seconds * GENERATION_TOKENS_PER_SECOND)))
+
+
+def build_answer_prompt(question: str, context_chunks: List[Dict[str, Any]], program_level: str = "beginner") -> str:
+    """Build the Claude prompt for a question and its retrieved context"""
     
     # Build context from retrieved chunks
     context = "\n\n".join([
@@ -201,21 +651,154 @@ Provide a comprehensive answer that:
 4. Maintains the appropriate depth for the {program_level} level
 
 ANSWER:"""
+    
+    return prompt
+
+
+def generate_answer(question: str, context_chunks: List[Dict[str, Any]], program_level: str = "beginner",
+                    priority: int = PRIORITY_INTERACTIVE, max_tokens: Optional[int] = None,
+                    timeout: Optional[float] = None) -> str:
+    """
+    Generate answer using Claude with retrieved context
+
+    With a timeout (seconds), raises TimeoutError instead of waiting on the
+    rate governor or Claude any longer than that.
+    """
+    prompt = build_answer_prompt(question, context_chunks, program_level)
+    max_tokens = max_tokens or ANSWER_MAX_TOKENS
+    reserved = estimate_tokens(prompt) + max_tokens
+    client = anthropic_client.with_options(timeout=timeout, max_retries=0) if timeout else anthropic_client
 
     try:
-        message = anthropic_client.messages.create(
+        anthropic_governor.acquire(tokens=reserved, priority=priority, timeout=timeout)
+        message = client.messages.create(
             model=CLAUDE_MODEL,
-            max_tokens=2000,
+            max_tokens=max_tokens,
             messages=[{"role": "user", "content": prompt}]
         )
+        anthropic_governor.settle(reserved, message.usage.input_tokens + message.usage.output_tokens)
         
         return message.content[0].text
         
+    except (AnthropicTimeoutError, RateLimitTimeout) as e:
+        raise TimeoutError(str(e))
     except Exception as e:
         logger.error(f"Answer generation failed: {e}")
         raise HTTPException(status_code=500, detail=f"Answer generation failed: {str(e)}")
 
 
+def warm_answers(entries: List[Tuple[str, str, Optional[str]]]) -> int:
+    """
+    Precompute answers for (question, program_level, tenant) entries
+    
+    Questions are embedded in one batched pass, retrieved per level, and
+    answered through the batch-generation path. Each stored answer records
+    the vectors and content hashes it was built from.
+    
+    Entries that retrieve nothing are dropped from the store. A failed
+    search or generation counts against a stale answer, which is dropped
+    after ANSWER_REWARM_MAX_FAILURES, so re-warms after every upload don't
+    retry it forever.
+    
+    Returns:
+        Number of answers stored
+    """
+    try:
+        embeddings = generate_embeddings([question for question, _, _ in entries], PRIORITY_BACKGROUND)
+    except Exception as e:
+        logger.error(f"Warm-up embedding failed: {e}")
+        answer_store.record_failures(entries)
+        return 0
+    
+    requests = []
+    retrieved = {}
+    empty = []
+    failed = []
+    for i, (entry, embedding) in enumerate(zip(entries, embeddings)):
+        question, program_level, tenant = entry
+        try:
+            matches = search_knowledge(embedding, top_k=ANSWER_CACHE_TOP_K, program_level=program_level,
+                                       tenant=tenant)
+        except Exception as e:
+            logger.warning(f"Warm-up search failed for {question!r}: {e}")
+            failed.append(entry)
+            continue
+        if not matches:
+            empty.append(entry)
+            continue
+        custom_id = f"warm-{i}"
+        retrieved[custom_id] = (entry, matches)
+        requests.append({
+            "custom_id": custom_id,
+            "prompt": build_answer_prompt(question, matches, program_level),
+            "max_tokens": ANSWER_MAX_TOKENS
+        })
+    
+    answers = {}
+    if requests:
+        try:
+            answers = get_batch_generator(anthropic_client, CLAUDE_MODEL).generate(requests)
+        except Exception as e:
+            logger.error(f"Warm-up generation failed: {e}")
+    
+    for custom_id, answer in answers.items():
+        (question, program_level, tenant), matches = retrieved[custom_id]
+        answer_store.put(
+            question, program_level, tenant, answer,
+            sources=format_sources(matches),
+            dependencies=[(source_namespace(match), match.id, match.metadata.get("content_hash"))
+                          for match in matches],
+            model=CLAUDE_MODEL
+        )
+    failed.extend(entry for custom_id, (entry, _) in retrieved.items() if custom_id not in answers)
+    
+    dropped = answer_store.discard(empty) + answer_store.record_failures(failed)
+    logger.info(f"Warmed {len(answers)} of {len(entries)} cached answers"
+                + (f", {len(failed)} failed, {dropped} dropped" if failed or dropped else ""))
+    return len(answers)
+
+
+async def rewarm_stale_answers():
+    """Regenerate answers whose sources changed; one pass at a time"""
+    async with rewarm_lock:
+        entries = answer_store.stale_entries()
+        if entries:
+            logger.info(f"Re-warming {len(entries)} stale answers")
+            await run_in_threadpool(warm_answers, entries)
+
+
+def schedule_warm(coro):
+    """Run a warm-up in the background, keeping a reference so it isn't garbage collected"""
+    def finished(task: asyncio.Task):
+        warm_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Answer warm-up failed: {task.exception()}")
+    
+    task = asyncio.create_task(coro)
+    warm_tasks.add(task)
+    task.add_done_callback(finished)
+
+
+def is_cacheable(request: QueryRequest) -> bool:
+    """Cached answers were built with default retrieval settings only"""
+    return (
+        answer_store is not None
+        and request.program_level is not None
+        and not request.filters
+        and request.top_k == ANSWER_CACHE_TOP_K
+        and request.mmr_lambda is None
+        and request.max_per_document is None
+    )
+
+
+def check_request_scope(program_level: Optional[str], tenant: Optional[str]):
+    """400 for a tenant or program level that has no namespace of its own"""
+    try:
+        check_scope(program_level, tenant)
+    except InvalidNamespace as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # === API ENDPOINTS ===
 
 @app.get("/")
@@ -269,56 +852,31 @@ async def upload_document(request: UploadRequest):
     3. Generates metadata tags
     4. Stores in Pinecone
     """
+    check_request_scope(request.program_level, request.tenant)
     try:
         logger.info(f"Processing document: {request.title}")
         
-        # Chunk the text
-        chunks = chunk_text(request.text)
-        logger.info(f"Created {len(chunks)} chunks")
+        # Tokenize in the worker pool; chunk boundaries are known before any embedding starts
+        tokens = await encode_parallel(request.text)
+        total_chunks = len(chunk_starts(len(tokens)))
+        logger.info(f"Created {total_chunks} chunks")
         
-        # Process each chunk
-        vectors_to_upsert = []
-        
-        for i, chunk in enumerate(chunks):
-            # Generate embedding
-            embedding = generate_embedding(chunk)
-            
-            # Generate tags
-            tags = generate_tags(chunk, use_ai=request.use_ai_tagging)
-            
-            # Create metadata
-            metadata = {
-                "text": chunk,
-                "title": request.title,
-                "source": request.source or "unknown",
-                "program_level": request.program_level,
-                "chunk_index": i,
-                "total_chunks": len(chunks),
-                "tags": tags.get("tags", []),
-                "detected_categories": tags.get("detected_categories", {}),
-                "primary_theme": tags.get("primary_theme", ""),
-                "consciousness_level": tags.get("consciousness_level", "")
-            }
-            
-            # Create vector ID
-            vector_id = f"{request.title.replace(' ', '_')}_{i}"
-            
-            vectors_to_upsert.append({
-                "id": vector_id,
-                "values": embedding,
-                "metadata": metadata
-            })
-        
-        # Upsert to Pinecone
-        index.upsert(vectors=vectors_to_upsert)
+        # Decode and keyword-tag in the pool while earlier batches embed and upsert
+        chunks_created, vectors_uploaded, duplicate_chunks = await run_ingest_pipeline(
+            document_token_batches(tokens), request.title, request.source, request.program_level,
+            request.use_ai_tagging, total_chunks=total_chunks, tenant=request.tenant
+        )
         
-        logger.info(f"Successfully uploaded {len(vectors_to_upsert)} vectors")
+        logger.info(f"Successfully uploaded {vectors_uploaded} vectors")
+        if answer_store is not None:
+            schedule_warm(rewarm_stale_answers())
         
         return {
             "status": "success",
             "message": f"Document '{request.title}' processed successfully",
-            "chunks_created": len(chunks),
-            "vectors_uploaded": len(vectors_to_upsert)
+            "chunks_created": chunks_created,
+            "vectors_uploaded": vectors_uploaded,
+            "duplicate_chunks": duplicate_chunks
         }
         
     except Exception as e:
@@ -326,6 +884,55 @@ async def upload_document(request: UploadRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/upload/file")
+async def upload_file(
+    file: UploadFile = File(...),
+    title: Optional[str] = Form(None),
+    source: Optional[str] = Form(None),
+    program_level: Optional[str] = Form("beginner"),
+    use_ai_tagging: Optional[bool] = Form(False),
+    tenant: Optional[str] = Form(None)
+):
+    """
+    Upload a document as a multipart file
+    
+    The file is read in UPLOAD_READ_SIZE pieces and pushed through the
+    chunker, embedder and upserter in bounded batches. Title defaults to
+    the filename without its extension.
+    """
+    async def read_pieces():
+        while piece := await file.read(UPLOAD_READ_SIZE):
+            yield piece
+    
+    return await ingest_stream(
+        read_pieces(),
+        title or Path(file.filename or "upload").stem,
+        source or file.filename,
+        program_level,
+        use_ai_tagging,
+        tenant
+    )
+
+
+@app.post("/upload/stream")
+async def upload_stream(
+    request: Request,
+    title: str,
+    source: Optional[str] = None,
+    program_level: Optional[str] = "beginner",
+    use_ai_tagging: bool = False,
+    tenant: Optional[str] = None
+):
+    """
+    Upload a document as a raw (optionally chunked) request body
+    
+    Metadata goes in query parameters. Unlike multipart uploads, which are
+    spooled before the handler runs, processing starts with the first bytes
+    received, so ingestion overlaps with the transfer.
+    """
+    return await ingest_stream(request.stream(), title, source, program_level, use_ai_tagging, tenant)
+
+
 @app.post("/query", response_model=QueryResponse)
 async def query_knowledge(request: QueryRequest):
     """
@@ -333,71 +940,243 @@ async def query_knowledge(request: QueryRequest):
     
     This endpoint:
     1. Generates embedding for the question
-    2. Searches Pinecone for relevant chunks
+    2. Searches Pinecone for relevant chunks (pre-filtered by the question's tags with auto_filter)
     3. Uses Claude to generate a contextual answer
+    
+    All three stages share one deadline (QUERY_DEADLINE_SECONDS, or the
+    request's shorter deadline_seconds). Running out of time before retrieval
+    finishes is a 504; running out during generation falls back to a
+    retrieval-only answer made of source snippets.
     """
+    check_request_scope(request.program_level, request.tenant)
     try:
         logger.info(f"Processing query: {request.question}")
         
-        # Generate embedding for question
-        question_embedding = generate_embedding(request.question)
+        tags = auto_filter_tags(request)
         
-        # Build filter
-        filter_dict = request.filters or {}
-        if request.program_level:
-            filter_dict["program_level"] = request.program_level
+        # Serve a precomputed answer when one is fresh (cached answers used unfiltered retrieval)
+        if not tags and is_cacheable(request):
+            cached = answer_store.get(request.question, request.program_level or "beginner", request.tenant)
+            if cached:
+                return QueryResponse(
+                    answer=cached["answer"],
+                    sources=cached["sources"],
+                    metadata={
+                        "matches_found": len(cached["sources"]),
+                        "program_level": request.program_level or "beginner",
+                        "model": cached["model"],
+                        "cached": True
+                    }
+                )
         
-        # Query Pinecone
-        query_response = index.query(
-            vector=question_embedding,
-            top_k=request.top_k,
-            include_metadata=True,
-            filter=filter_dict if filter_dict else None
-        )
+        deadline = Deadline(min(request.deadline_seconds or QUERY_DEADLINE_SECONDS, QUERY_DEADLINE_SECONDS))
+        reserve = min(GENERATION_RESERVE_SECONDS, deadline.budget / 2)
         
-        # Extract matches
-        matches = query_response.matches
+        try:
+            # Generate embedding for question, holding time back for generation
+            question_embedding = await deadline.run(
+                "embedding", generate_embedding, request.question,
+                reserve=reserve
+            )
+            
+            # Query Pinecone, narrowed to the question's tags when auto-filtering
+            matches, fell_back = await deadline.run(
+                "search",
+                search_with_tag_filter,
+                question_embedding,
+                tags,
+                reserve=reserve,
+                top_k=request.top_k,
+                program_level=request.program_level,
+                filters=request.filters,
+                mmr_lambda=request.mmr_lambda,
+                max_per_document=request.max_per_document,
+                tenant=request.tenant
+            )
+        except DeadlineExceeded as e:
+            logger.warning(f"Query timed out: {e}")
+            raise HTTPException(status_code=504, detail={"error": str(e), "deadline": deadline.report()})
+        
+        auto_filter = {"tags": tags, "fallback": fell_back} if tags else None
         
         if not matches:
             return QueryResponse(
-                answer="I couldn't find relevant information in the knowledge base to answer your question. Please try rephrasing or asking about a different topic.",
+                answer=NO_MATCHES_ANSWER,
                 sources=[],
-                metadata={"matches_found": 0}
+                metadata={"matches_found": 0, "auto_filter": auto_filter, "deadline": deadline.report()}
             )
         
-        # Generate answer using Claude
-        answer = generate_answer(
-            request.question,
-            matches,
-            request.program_level or "beginner"
-        )
+        # Generate answer using Claude, sized to the time left
+        answer = None
+        if deadline.remaining() >= GENERATION_MIN_SECONDS:
+            try:
+                answer = await deadline.run(
+                    "generation",
+                    generate_answer,
+                    request.question,
+                    matches,
+                    request.program_level or "beginner",
+                    max_tokens=answer_token_budget(deadline.remaining())
+                )
+            except DeadlineExceeded as e:
+                logger.warning(f"Falling back to retrieval-only answer: {e}")
+        else:
+            deadline.skip("generation")
         
-        # Format sources
-        sources = [
-            {
-                "title": match.metadata.get("title", "Unknown"),
-                "source": match.metadata.get("source", "Unknown"),
-                "score": match.score,
-                "tags": match.metadata.get("tags", [])
-            }
-            for match in matches
-        ]
+        sources = format_sources(matches)
+        if answer is None:
+            for source, match in zip(sources, matches):
+                source["snippet"] = match.metadata.get("text", "")[:SNIPPET_CHARS]
         
         return QueryResponse(
-            answer=answer,
+            answer=answer if answer is not None else format_snippets(matches),
             sources=sources,
             metadata={
                 "matches_found": len(matches),
                 "program_level": request.program_level or "beginner",
-                "model": CLAUDE_MODEL
+                "model": CLAUDE_MODEL if answer is not None else None,
+                "degraded": answer is None,
+                "auto_filter": auto_filter,
+                "deadline": deadline.report()
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Query failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/query/batch")
+async def query_batch(request: BatchQueryRequest):
+    """
+    Run many questions through the RAG pipeline in one call
+    
+    This endpoint:
+    1. Embeds every question in batched OpenAI requests
+    2. Runs the Pinecone searches concurrently
+    3. Optionally generates answers with bounded parallelism
+    4. Streams one JSON line per question as soon as it finishes
+    
+    Batch work runs at background priority, and searches and generations are
+    capped per batch, so it doesn't crowd out live /query traffic.
+    Each line carries the question's `index` since results arrive in completion order.
+    """
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="No questions provided")
+    if len(request.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many questions ({len(request.questions)}), maximum is {BATCH_MAX_QUESTIONS}"
+        )
+    check_request_scope(request.program_level, request.tenant)
+    
+    logger.info(f"Processing batch query: {len(request.questions)} questions")
+    
+    # One embedding pass for the whole batch; failures here fail the request
+    embeddings = await run_in_threadpool(generate_embeddings, request.questions, PRIORITY_BACKGROUND)
+    
+    program_level = request.program_level or "beginner"
+    generation_slots = asyncio.Semaphore(max(1, min(request.max_concurrency or 1, BATCH_MAX_CONCURRENCY)))
+    search_slots = asyncio.Semaphore(max(1, BATCH_SEARCH_CONCURRENCY))
+    
+    async def answer_one(i: int, question: str, embedding: List[float]) -> Dict[str, Any]:
+        try:
+            async with search_slots:
+                matches = await run_in_threadpool(
+                    search_knowledge, embedding, request.top_k, request.program_level, request.filters,
+                    request.mmr_lambda, request.max_per_document, request.tenant
+                )
+            
+            result = {
+                "index": i,
+                "question": question,
+                "sources": format_sources(matches),
+                "metadata": {"matches_found": len(matches), "program_level": program_level}
+            }
+            
+            if request.generate_answers:
+                if matches:
+                    async with generation_slots:
+                        result["answer"] = await run_in_threadpool(
+                            generate_answer, question, matches, program_level, PRIORITY_BACKGROUND
+                        )
+                    result["metadata"]["model"] = CLAUDE_MODEL
+                else:
+                    result["answer"] = NO_MATCHES_ANSWER
+            
+            return result
+        except Exception as e:
+            logger.error(f"Batch question {i} failed: {e}")
+            return {"index": i, "question": question, "error": getattr(e, "detail", str(e))}
+    
+    async def stream_results():
+        tasks = [
+            asyncio.create_task(answer_one(i, question, embedding))
+            for i, (question, embedding) in enumerate(zip(request.questions, embeddings))
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            # Client went away: don't keep spending on unanswered questions
+            for task in tasks:
+                task.cancel()
+    
+    # Stop nginx buffering the stream so lines reach the client as they finish
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson",
+                             headers={"X-Accel-Buffering": "no"})
+
+
+@app.post("/cache/warm")
+async def warm_cache(request: WarmRequest):
+    """
+    Precompute answers for popular questions in the background
+    
+    Every question is answered once per requested program level. Progress
+    shows up in GET /cache/stats.
+    """
+    if answer_store is None:
+        raise HTTPException(status_code=400, detail="Answer cache is disabled (ANSWER_CACHE_ENABLED=false)")
+    
+    levels = request.program_levels or PROGRAM_LEVELS
+    for level in levels:
+        check_request_scope(level, request.tenant)
+    entries = [(question, level, request.tenant) for question in request.questions for level in levels]
+    schedule_warm(run_in_threadpool(warm_answers, entries))
+    
+    return {
+        "status": "accepted",
+        "questions": len(request.questions),
+        "program_levels": levels,
+        "answers_scheduled": len(entries)
+    }
+
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """Answer cache size, stale entries and running warm-ups"""
+    if answer_store is None:
+        return {"enabled": False}
+    return {"enabled": True, "warm_jobs_running": len(warm_tasks), **answer_store.get_stats()}
+
+
+@app.get("/profiles")
+def get_profiles(limit: int = 50):
+    """Recent request profiles, newest first"""
+    return {"enabled": PROFILING_ENABLED, "profiles": list_profiles(limit)}
+
+
+@app.get("/profiles/{request_id}", response_class=PlainTextResponse)
+def get_profile(request_id: str):
+    """Collapsed stacks for one profile (open in speedscope or flamegraph.pl)"""
+    path = profile_path(request_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {request_id}")
+    return path.read_text()
+
+
 @app.get("/stats")
 def get_stats():
     """Get database statistics"""
@@ -408,13 +1187,23 @@ def get_stats():
             "index_name": PINECONE_INDEX_NAME,
             "total_vectors": stats.total_vector_count,
             "dimension": PINECONE_DIMENSION,
-            "namespaces": stats.namespaces
+            "namespaces": {
+                (name or "(default)"): {"vector_count": summary.vector_count}
+                for name, summary in stats.namespaces.items()
+            },
+            "dedup": dedup_index.get_stats() if dedup_index is not None else {"policy": "off"}
         }
     except Exception as e:
         logger.error(f"Stats retrieval failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/rate-limits")
+def get_rate_limits():
+    """Provider rate governor state: bucket levels, queue depth and wait times"""
+    return get_rate_limit_stats()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Evolve Consciousness Engine - Namespace Migration Tool
+Move vectors from the default namespace into per-program_level namespaces, online and in batches
+"""
+
+from dotenv import load_dotenv
+import os
+load_dotenv(override=True)
+
+import argparse
+from collections import Counter
+from typing import Dict, List, Optional
+
+from pinecone import Pinecone
+
+from namespaces import LEGACY_NAMESPACE, PROGRAM_LEVELS, UNLEVELED, InvalidNamespace, check_scope, namespace_for
+
+LIST_PAGE_SIZE = 100  # Pinecone's maximum for list_paginated
+
+
+class NamespaceMigrator:
+    """
+    Drains the default namespace into per-program_level namespaces
+
+    Lists the default namespace's IDs once, then moves them in batches:
+    each batch is fetched, upserted into the target namespace of each
+    vector's program level and only then deleted from the source, so every
+    vector stays searchable throughout (the API merges the legacy namespace
+    into queries and de-duplicates by ID). Vectors of levels not being
+    migrated are counted and left in place. Re-running after an
+    interruption simply picks up what is left.
+    """
+
+    def __init__(self, index, batch_size: int = LIST_PAGE_SIZE, tenant: Optional[str] = None,
+                 dry_run: bool = False):
+        self.index = index
+        self.batch_size = min(batch_size, LIST_PAGE_SIZE)
+        self.tenant = tenant
+        self.dry_run = dry_run
+        self.stats = {"moved": 0, "batches": 0, "by_level": Counter(), "left": Counter()}
+
+    def pages(self):
+        """Yield the default namespace's vector IDs a batch at a time"""
+        # List everything before moving anything: deleting while paginating could shift the pages
+        ids = []
+        pagination_token = None
+        while True:
+            page = self.index.list_paginated(namespace=LEGACY_NAMESPACE, limit=LIST_PAGE_SIZE,
+                                             pagination_token=pagination_token)
+            ids.extend(item.id for item in page.vectors)
+            pagination_token = page.pagination.next if page.pagination else None
+            if pagination_token is None:
+                break
+        for start in range(0, len(ids), self.batch_size):
+            yield ids[start:start + self.batch_size]
+
+    def migrate_page(self, ids: List[str], levels: List[str]):
+        fetched = self.index.fetch(ids=ids, namespace=LEGACY_NAMESPACE).vectors
+        by_target = {}
+        for vector_id, vector in fetched.items():
+            metadata = dict(vector.metadata or {})
+            level = metadata.get("program_level") or UNLEVELED
+            if level not in levels:
+                self.stats["left"][level] += 1
+                continue
+            if self.tenant:
+                metadata["tenant"] = self.tenant
+            by_target.setdefault(level, []).append({"id": vector_id, "values": vector.values, "metadata": metadata})
+
+        for level, vectors in by_target.items():
+            if not self.dry_run:
+                # Copy first, then delete: a crash in between only leaves duplicates
+                self.index.upsert(vectors=vectors, namespace=namespace_for(level, self.tenant))
+                self.index.delete(ids=[v["id"] for v in vectors], namespace=LEGACY_NAMESPACE)
+            self.stats["by_level"][level] += len(vectors)
+            self.stats["moved"] += len(vectors)
+
+    def migrate(self, levels: List[str]) -> Dict:
+        if namespace_for(levels[0], self.tenant) == LEGACY_NAMESPACE:
+            print("  ⚠️  Namespace sharding is disabled (NAMESPACE_SHARDING=false), nothing to do")
+            return self.stats
+
+        for level in levels:
+            print(f"  {level} → namespace '{namespace_for(level, self.tenant)}'")
+
+        for ids in self.pages():
+            self.migrate_page(ids, levels)
+            self.stats["batches"] += 1
+            verb = "Would move" if self.dry_run else "Moved"
+            print(f"  {verb} {self.stats['moved']} vectors, {sum(self.stats['left'].values())} left in place...")
+        return self.stats
+
+
+def print_namespace_counts(index):
+    stats = index.describe_index_stats()
+    for name, summary in sorted(stats.namespaces.items()):
+        print(f"  {name or '(default)':<30} {summary.vector_count:>10}")
+
+
+def main():
+    default_levels = PROGRAM_LEVELS + [UNLEVELED]
+    parser = argparse.ArgumentParser(description="Move vectors into per-program_level namespaces")
+    parser.add_argument("--level", type=str, action="append",
+                       help=f"Program level to migrate (repeatable, default: {', '.join(default_levels)}; "
+                            f"'{UNLEVELED}' covers vectors without a program_level)")
+    parser.add_argument("--tenant", type=str, default=None,
+                       help="Tenant to assign the migrated vectors to")
+    parser.add_argument("--batch-size", type=int, default=LIST_PAGE_SIZE,
+                       help=f"Vectors moved per batch (default and max: {LIST_PAGE_SIZE})")
+    parser.add_argument("--dry-run", action="store_true",
+                       help="Report what would move without changing anything")
+
+    args = parser.parse_args()
+    levels = args.level or default_levels
+    for level in levels:
+        try:
+            check_scope(level, args.tenant)
+        except InvalidNamespace as e:
+            parser.error(str(e))
+
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    index = pc.Index(os.getenv("PINECONE_INDEX_NAME", "evolve-consciousness"))
+
+    print("\n📊 Namespaces before migration:")
+    print_namespace_counts(index)
+
+    migrator = NamespaceMigrator(
+        index,
+        batch_size=args.batch_size,
+        tenant=args.tenant,
+        dry_run=args.dry_run
+    )
+    print()
+    stats = migrator.migrate(levels)
+
+    print("\n" + "="*60)
+    print("  MIGRATION SUMMARY" + (" (dry run)" if args.dry_run else ""))
+    print("="*60)
+    for level, moved in stats["by_level"].items():
+        print(f"{level:<16} {moved:>10} vectors")
+    print(f"Total {'to move' if args.dry_run else 'moved'}:     {stats['moved']}")
+    print("="*60)
+
+    if not args.dry_run:
+        print("\n📊 Namespaces after migration:")
+        print_namespace_counts(index)
+
+    if stats["left"]:
+        print("\n⚠️  The default namespace still holds vectors; keep NAMESPACE_INCLUDE_LEGACY=true.")
+        print("Remaining vectors by program_level:")
+        for level, count in stats["left"].most_common():
+            print(f"  {level:<30} {count:>10}")
+        print("Migrate them with --level <name>.\n")
+    elif args.dry_run:
+        print("\nA real run would empty the default namespace.\n")
+    else:
+        print("\n✅ The default namespace is empty. Set NAMESPACE_INCLUDE_LEGACY=false")
+        print("so queries stop searching it.\n")
+
+
+if __name__ == "__main__":
+    main()
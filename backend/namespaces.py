@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Evolve Consciousness Engine - Namespace Routing
+Per-program_level (and optionally per-tenant) Pinecone namespaces
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE_SHARDING = os.getenv("NAMESPACE_SHARDING", "true").lower() == "true"
+# Keep searching the default namespace until migrate_namespaces.py has emptied it
+NAMESPACE_INCLUDE_LEGACY = os.getenv("NAMESPACE_INCLUDE_LEGACY", "true").lower() == "true"
+# How often the list of namespaces that level-less queries fan out to is re-read from the index
+NAMESPACE_REFRESH_SECONDS = float(os.getenv("NAMESPACE_REFRESH_SECONDS", "60"))
+
+PROGRAM_LEVELS = ["beginner", "intermediate", "advanced"]
+LEGACY_NAMESPACE = ""  # Pinecone's default namespace
+UNLEVELED = "unleveled"  # Namespace (level part) for uploads without a program level
+SEPARATOR = ":"  # Between tenant and level; not allowed in either
+
+
+class InvalidNamespace(ValueError):
+    """A tenant or program level that can't be mapped to a namespace unambiguously"""
+
+
+def check_scope(program_level: Optional[str], tenant: Optional[str] = None):
+    """
+    Reject tenants and levels containing the separator
+
+    Otherwise tenant "acme:x" would write to a namespace that tenant "acme"
+    reads as one of its levels, and level "acme:beginner" without a tenant
+    would reach tenant "acme"'s namespace.
+    """
+    for field, value in (("tenant", tenant), ("program_level", program_level)):
+        if value and SEPARATOR in value:
+            raise InvalidNamespace(f"{field} must not contain '{SEPARATOR}': {value!r}")
+
+
+def namespace_for(program_level: Optional[str], tenant: Optional[str] = None) -> str:
+    """Namespace that vectors for this level/tenant are written to"""
+    check_scope(program_level, tenant)
+    if not NAMESPACE_SHARDING:
+        return LEGACY_NAMESPACE
+    level = program_level or UNLEVELED
+    return f"{tenant}{SEPARATOR}{level}" if tenant else level
+
+
+def tenant_namespaces(names: Iterable[str], tenant: Optional[str] = None) -> Set[str]:
+    """The sharded namespaces among names that belong to this tenant (or to no tenant)"""
+    found = set()
+    for name in names:
+        # Exactly "<tenant>:<level>" or "<level>"; anything else wasn't written by namespace_for
+        parts = name.split(SEPARATOR)
+        if not all(parts) or len(parts) > 2:
+            continue
+        owner = parts[0] if len(parts) == 2 else None
+        if owner == (tenant or None):
+            found.add(name)
+    return found
+
+
+def query_plan(program_level: Optional[str], tenant: Optional[str] = None,
+               filters: Optional[Dict[str, Any]] = None,
+               known_namespaces: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """
+    Namespaces to search and the metadata filter to use in each
+
+    Sharded namespaces need no program_level filter. The legacy namespace
+    (still holding unmigrated vectors) keeps the filter so results match.
+    Without a program level, every namespace of the tenant is searched: the
+    standard levels plus any other level found among known_namespaces.
+
+    Returns:
+        List of {"namespace": str, "filter": dict or None}
+    """
+    base = dict(filters or {})
+
+    if not NAMESPACE_SHARDING:
+        legacy = dict(base)
+        if program_level:
+            legacy["program_level"] = program_level
+        return [{"namespace": LEGACY_NAMESPACE, "filter": legacy or None}]
+
+    if program_level:
+        namespaces = [namespace_for(program_level, tenant)]
+    else:
+        namespaces = sorted(
+            {namespace_for(level, tenant) for level in PROGRAM_LEVELS}
+            | tenant_namespaces(known_namespaces, tenant)
+        )
+    plan = [{"namespace": namespace, "filter": base or None} for namespace in namespaces]
+
+    if NAMESPACE_INCLUDE_LEGACY and not tenant:
+        legacy = dict(base)
+        if program_level:
+            legacy["program_level"] = program_level
+        plan.append({"namespace": LEGACY_NAMESPACE, "filter": legacy or None})
+
+    return plan
+
+
+class NamespaceCatalog:
+    """
+    Namespaces present in the index
+
+    Read from describe_index_stats at most every NAMESPACE_REFRESH_SECONDS;
+    namespaces written by this process are added right away.
+    """
+
+    def __init__(self, refresh_seconds: float = NAMESPACE_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._names: Set[str] = set()
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def names(self, index) -> Set[str]:
+        with self._lock:
+            if time.monotonic() - self._fetched_at >= self.refresh_seconds:
+                try:
+                    self._names |= set(index.describe_index_stats().namespaces)
+                except Exception as e:
+                    logger.warning(f"Namespace refresh failed, using the last known list: {e}")
+                self._fetched_at = time.monotonic()
+            return set(self._names)
+
+    def add(self, name: str):
+        with self._lock:
+            self._names.add(name)
+
+
+def merge_matches(match_lists: List[List[Any]], top_k: Optional[int] = None) -> List[Any]:
+    """
+    Merge per-namespace results by score
+
+    A vector caught mid-migration can appear in two namespaces; only its
+    best-scoring copy is kept.
+    """
+    best = {}
+    for matches in match_lists:
+        for match in matches:
+            if match.id not in best or match.score > best[match.id].score:
+                best[match.id] = match
+
+    merged = sorted(best.values(), key=lambda match: match.score, reverse=True)
+    return merged if top_k is None else merged[:top_k]
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Evolve Consciousness Engine - Request Profiling
+Opt-in sampling profiles of individual requests, saved as collapsed stacks
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+
+PROFILE_HEADER = b"x-profile"
+REQUEST_ID_HEADER = b"x-request-id"
+
+# Leaf functions of threads that are parked rather than working
+IDLE_FUNCTIONS = {"wait", "select", "poll", "_worker", "_wait_for_tstate_lock", "get", "accept", "sleep"}
+
+
+class StackSampler:
+    """
+    Samples every Python thread's stack at a fixed interval
+
+    Covers the event loop and threadpool workers alike (where embedding,
+    search and generation run). Idle threads are skipped; samples from
+    other requests running concurrently are included.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or frame.f_code.co_name in IDLE_FUNCTIONS:
+                    continue
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+
+def safe_request_id(value: Optional[str]) -> str:
+    """Request IDs become file names; keep them to a safe alphabet"""
+    cleaned = re.sub(r"[^A-Za-z0-9_.-]", "", value or "")[:64]
+    return cleaned or uuid.uuid4().hex
+
+
+def save_profile(request_id: str, samples: Counter, info: Dict[str, Any]):
+    """Write collapsed stacks (flamegraph.pl / speedscope format) plus a JSON summary"""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(PROFILE_DIR / f"{request_id}.collapsed", "w") as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+    (PROFILE_DIR / f"{request_id}.json").write_text(json.dumps(
+        {"request_id": request_id, "samples": sum(samples.values()), **info}
+    ))
+
+    # Prune the oldest profiles beyond PROFILE_KEEP
+    summaries = sorted(PROFILE_DIR.glob("*.json"), key=lambda path: path.stat().st_mtime)
+    for path in summaries[:-PROFILE_KEEP]:
+        path.unlink(missing_ok=True)
+        path.with_suffix(".collapsed").unlink(missing_ok=True)
+
+
+def list_profiles(limit: int = 50) -> List[Dict[str, Any]]:
+    """Most recent profile summaries first"""
+    if not PROFILE_DIR.exists():
+        return []
+    summaries = sorted(PROFILE_DIR.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+    profiles = []
+    for path in summaries[:limit]:
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue  # Pruned or half-written
+    return profiles
+
+
+def profile_path(request_id: str) -> Optional[Path]:
+    path = PROFILE_DIR / f"{safe_request_id(request_id)}.collapsed"
+    return path if path.exists() else None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests that send `X-Profile: 1`, plus a
+    random PROFILE_SAMPLE_RATE fraction of all requests
+
+    Unprofiled requests cost one header scan. Profiled responses carry an
+    `X-Profile-Id` header naming the saved profile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _should_profile(self, scope) -> bool:
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_HEADER:
+                return value in (b"1", b"true")
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers", ()))
+        request_id = safe_request_id(headers.get(REQUEST_ID_HEADER, b"").decode("latin1"))
+        status = None
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"x-profile-id", request_id.encode())]}
+            await send(message)
+
+        sampler = StackSampler()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            duration = time.perf_counter() - started
+            # Joining the sampler and writing files would stall every request on the loop
+            await run_in_threadpool(self._finish, sampler, request_id, {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "duration_ms": round(duration * 1000, 1),
+                "interval_ms": PROFILE_INTERVAL * 1000,
+                "created_at": time.time(),
+            })
+
+    @staticmethod
+    def _finish(sampler: StackSampler, request_id: str, info: Dict[str, Any]):
+        samples = sampler.stop()
+        try:
+            save_profile(request_id, samples, info)
+            logger.info(f"Saved profile {request_id} for {info['method']} {info['path']} "
+                        f"({info['duration_ms'] / 1000:.3f}s)")
+        except OSError as e:
+            logger.error(f"Failed to save profile {request_id}: {e}")
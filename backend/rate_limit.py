@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Evolve Consciousness Engine - Provider Rate Governor
+Process-wide token buckets for OpenAI and Anthropic calls with priority queueing
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Priorities: lower value is served first
+PRIORITY_INTERACTIVE = 0  # /query traffic
+PRIORITY_BACKGROUND = 1   # ingestion and AI tagging
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BACKGROUND: "background",
+}
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a caller gives up waiting for rate limit capacity"""
+
+
+class TokenBucket:
+    """Continuously refilling bucket sized to one minute of allowance"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def clamp(self, amount: float) -> float:
+        """Requests larger than the bucket could never be served, cap them"""
+        return min(amount, self.capacity)
+
+    def time_until(self, amount: float) -> float:
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+
+class ProviderGovernor:
+    """
+    Requests/min and tokens/min governor for a single provider
+
+    Callers block in acquire() until both buckets have room. Waiters are
+    served strictly by (priority, arrival order), so interactive traffic
+    jumps ahead of queued ingestion work instead of failing with a 429.
+    """
+
+    def __init__(self, name: str, requests_per_minute: int, tokens_per_minute: int):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._counter = itertools.count()
+        self._stats = {
+            name: {"acquired": 0, "timeouts": 0, "total_wait": 0.0, "max_wait": 0.0}
+            for name in PRIORITY_NAMES.values()
+        }
+
+    def acquire(self, tokens: int = 0, priority: int = PRIORITY_INTERACTIVE,
+                timeout: Optional[float] = None) -> float:
+        """
+        Reserve one request and `tokens` tokens, waiting if necessary
+
+        Args:
+            tokens: Estimated tokens the call will consume
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BACKGROUND
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            Seconds spent waiting in the queue
+        """
+        tokens = self.tokens.clamp(tokens)
+        ticket = (priority, next(self._counter))
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.requests.refill(now)
+                    self.tokens.refill(now)
+
+                    if self._waiters[0] == ticket:
+                        wait = max(self.requests.time_until(1), self.tokens.time_until(tokens))
+                        if wait == 0.0:
+                            self.requests.level -= 1
+                            self.tokens.level -= tokens
+                            break
+                    else:
+                        # Not at the head of the queue; wake up when it changes
+                        wait = None
+
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self._stats[PRIORITY_NAMES[priority]]["timeouts"] += 1
+                            raise RateLimitTimeout(
+                                f"{self.name} rate limit wait exceeded {timeout:.1f}s"
+                            )
+                        wait = remaining if wait is None else min(wait, remaining)
+
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+            waited = time.monotonic() - started
+            stats = self._stats[PRIORITY_NAMES[priority]]
+            stats["acquired"] += 1
+            stats["total_wait"] += waited
+            stats["max_wait"] = max(stats["max_wait"], waited)
+
+        if waited > 1.0:
+            logger.info(f"{self.name} governor: {PRIORITY_NAMES[priority]} call waited {waited:.2f}s")
+        return waited
+
+    def settle(self, reserved: int, actual: int):
+        """Return unused tokens (or charge overruns) once real usage is known"""
+        with self._cond:
+            self.tokens.refill(time.monotonic())
+            reserved = self.tokens.clamp(reserved)
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + reserved - actual)
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _ in self._waiters:
+                depth[PRIORITY_NAMES[priority]] += 1
+
+            return {
+                "requests_per_minute": int(self.requests.capacity),
+                "tokens_per_minute": int(self.tokens.capacity),
+                "requests_available": round(self.requests.level, 1),
+                "tokens_available": round(self.tokens.level, 1),
+                "queue_depth": depth,
+                "wait": {
+                    name: {
+                        "acquired": s["acquired"],
+                        "timeouts": s["timeouts"],
+                        "avg_wait_seconds": round(s["total_wait"] / s["acquired"], 3) if s["acquired"] else 0.0,
+                        "max_wait_seconds": round(s["max_wait"], 3),
+                    }
+                    for name, s in self._stats.items()
+                },
+            }
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) for reservations"""
+    return len(text) // 4 + 1
+
+
+# Process-wide governors, configured from the environment
+openai_governor = ProviderGovernor(
+    "openai",
+    requests_per_minute=int(os.getenv("OPENAI_RPM", "3000")),
+    tokens_per_minute=int(os.getenv("OPENAI_TPM", "1000000")),
+)
+
+anthropic_governor = ProviderGovernor(
+    "anthropic",
+    requests_per_minute=int(os.getenv("ANTHROPIC_RPM", "50")),
+    tokens_per_minute=int(os.getenv("ANTHROPIC_TPM", "40000")),
+)
+
+
+def get_rate_limit_stats() -> Dict[str, Any]:
+    """Snapshot of every provider governor"""
+    return {
+        "openai": openai_governor.get_stats(),
+        "anthropic": anthropic_governor.get_stats(),
+    }
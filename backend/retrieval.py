@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Evolve Consciousness Engine - Retrieval Re-ranking
+Maximal Marginal Relevance and duplicate collapsing over over-fetched Pinecone candidates
+"""
+
+from typing import Any, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+
+def mmr_select(query_vector: Sequence[float], candidate_vectors: Sequence[Sequence[float]], k: int,
+               lambda_mult: float = 0.7, groups: Optional[Sequence[Hashable]] = None,
+               max_per_group: int = 0) -> List[int]:
+    """
+    Pick k candidates by Maximal Marginal Relevance
+
+    Each step takes the candidate maximizing
+        lambda_mult * sim(query, c) - (1 - lambda_mult) * max(sim(c, selected))
+    so lambda_mult=1.0 is pure relevance and 0.0 is pure diversity.
+
+    Args:
+        query_vector: Query embedding
+        candidate_vectors: Candidate embeddings, in any order
+        k: Number of candidates to select
+        lambda_mult: Relevance/diversity trade-off in [0, 1]
+        groups: Optional group key per candidate (e.g. document title)
+        max_per_group: Cap on selections sharing a group key (0 disables)
+
+    Returns:
+        Indices into candidate_vectors, in selection order
+    """
+    n = len(candidate_vectors)
+    if n == 0 or k <= 0:
+        return []
+
+    candidates = np.array(candidate_vectors, dtype=np.float32)
+    query = np.array(query_vector, dtype=np.float32)
+
+    # Cosine similarity via normalized dot products
+    candidates /= np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query /= max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+
+    max_similarity = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    group_counts = {}
+    selected = []
+
+    while len(selected) < min(k, n) and available.any():
+        if selected:
+            scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_similarity
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+
+        if groups is not None and max_per_group > 0:
+            group = groups[best]
+            group_counts[group] = group_counts.get(group, 0) + 1
+            if group_counts[group] >= max_per_group:
+                available &= np.array([g != group for g in groups])
+
+    return selected
+
+
+def mmr_rerank(query_vector: Sequence[float], matches: List[Any], top_k: int, lambda_mult: float = 0.7,
+               max_per_document: int = 0) -> List[Any]:
+    """
+    Re-rank Pinecone matches (queried with include_values=True) by MMR
+
+    Documents are identified by their `title` metadata, matching how vector IDs are built at upload.
+    """
+    if not matches:
+        return []
+
+    groups = [(match.metadata or {}).get("title", match.id) for match in matches]
+    order = mmr_select(
+        query_vector,
+        [match.values for match in matches],
+        top_k,
+        lambda_mult=lambda_mult,
+        groups=groups,
+        max_per_group=max_per_document,
+    )
+    return [matches[i] for i in order]
+
+
+def drop_duplicates(matches: List[Any]) -> List[Any]:
+    """
+    Keep only the best-scoring match per passage
+
+    Chunks stored as near-duplicates carry a `duplicate_of` back-reference
+    to their canonical chunk; those sharing a canonical chunk collapse into one.
+    """
+    seen = set()
+    unique = []
+    for match in matches:
+        key = (match.metadata or {}).get("duplicate_of") or match.id
+        if key not in seen:
+            seen.add(key)
+            unique.append(match)
+    return unique
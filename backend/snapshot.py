@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Evolve Consciousness Engine - Index Snapshots
+Export the vector index to a compact local snapshot and restore it without re-embedding
+
+Snapshot layout:
+    manifest.json            Dimension, dtype, namespaces, progress and checksums
+    vectors.npy              (N, dimension) float32/float16 matrix, one row per vector
+    metadata/part-00000.parquet ...
+                             Columnar id, namespace and metadata, rows aligned with vectors.npy
+"""
+
+from dotenv import load_dotenv
+import os
+load_dotenv(override=True)
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+MANIFEST = "manifest.json"
+VECTORS = "vectors.npy"
+METADATA_DIR = "metadata"
+NPY_HEADER_SIZE = 128  # Fixed so the row count can be patched in place
+LIST_PAGE_SIZE = 100   # Pinecone's maximum for list_paginated
+FETCH_BATCH_SIZE = 100
+
+
+# === FILE HELPERS ===
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1024 * 1024):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_npy_header(f, rows: int, dimension: int, dtype: str):
+    """Write a fixed-size .npy v1.0 header so rows can be appended and the shape patched later"""
+    header = repr({"descr": np.dtype(dtype).str, "fortran_order": False, "shape": (rows, dimension)})
+    header = header.encode("latin1").ljust(NPY_HEADER_SIZE - 10 - 1) + b"\n"
+    f.seek(0)
+    f.write(b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header)
+
+
+def encode_metadata(metadatas: List[Dict[str, Any]]) -> Tuple[Dict[str, pa.Array], List[str]]:
+    """
+    Metadata of many vectors as one Arrow column per key
+
+    Columns cover every key seen in any vector (missing values are null), so
+    sparse keys survive. Columns Arrow can't type consistently (dicts, mixed
+    lists, mixed scalar types) are stored as JSON strings.
+
+    Returns:
+        (columns, json_keys)
+    """
+    keys = list(dict.fromkeys(key for metadata in metadatas for key in metadata))
+    columns = {}
+    json_keys = []
+    for key in keys:
+        values = [metadata.get(key) for metadata in metadatas]
+        needs_json = any(
+            isinstance(value, dict) or (isinstance(value, list) and not all(isinstance(v, str) for v in value))
+            for value in values
+        )
+        if not needs_json:
+            try:
+                columns[key] = pa.array(values)
+                continue
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                pass
+        columns[key] = pa.array([None if value is None else json.dumps(value) for value in values], pa.string())
+        json_keys.append(key)
+    return columns, json_keys
+
+
+def decode_metadata(row: Dict[str, Any], json_keys: List[str]) -> Dict[str, Any]:
+    metadata = {}
+    for key, value in row.items():
+        if key in ("id", "namespace") or value is None:
+            continue
+        metadata[key] = json.loads(value) if key in json_keys else value
+    return metadata
+
+
+def load_manifest(snapshot_dir: Path) -> Optional[Dict[str, Any]]:
+    path = snapshot_dir / MANIFEST
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def save_manifest(snapshot_dir: Path, manifest: Dict[str, Any]):
+    """Write atomically so a crash never leaves a half-written manifest"""
+    tmp = snapshot_dir / (MANIFEST + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp, snapshot_dir / MANIFEST)
+
+
+# === EXPORT ===
+
+class SnapshotExporter:
+    """
+    Streams every namespace of an index into a snapshot directory
+
+    IDs are listed page by page and fetched in parallel; each part of
+    rows_per_part vectors is appended to vectors.npy and written as one
+    parquet file, then the manifest records the rows written and the
+    pagination token to continue from. An interrupted export resumes from
+    the last completed part.
+    """
+
+    def __init__(self, index, snapshot_dir: Path, dimension: int, dtype: str = "float32",
+                 rows_per_part: int = 5000, fetch_workers: int = 8):
+        self.index = index
+        self.snapshot_dir = snapshot_dir
+        self.dimension = dimension
+        self.dtype = dtype
+        self.rows_per_part = rows_per_part
+        self.fetch_workers = fetch_workers
+
+    def _fetch(self, ids: List[str], namespace: str) -> List[Tuple[str, Any]]:
+        vectors = self.index.fetch(ids=ids, namespace=namespace).vectors
+        # fetch returns a dict; keep listing order and drop IDs deleted since listing
+        return [(vector_id, vectors[vector_id]) for vector_id in ids if vector_id in vectors]
+
+    def _parts(self, namespace: str, pagination_token: Optional[str], pool: ThreadPoolExecutor
+               ) -> Iterator[Tuple[List[Tuple[str, Any]], Optional[str]]]:
+        """Yield (vectors, next_token) per part; next_token is None after the last part"""
+        ids = []
+        while True:
+            page = self.index.list_paginated(namespace=namespace, limit=LIST_PAGE_SIZE,
+                                             pagination_token=pagination_token)
+            ids.extend(item.id for item in page.vectors)
+            pagination_token = page.pagination.next if page.pagination else None
+
+            if len(ids) >= self.rows_per_part or pagination_token is None:
+                batches = [ids[i:i + FETCH_BATCH_SIZE] for i in range(0, len(ids), FETCH_BATCH_SIZE)]
+                vectors = []
+                for fetched in pool.map(lambda batch: self._fetch(batch, namespace), batches):
+                    vectors.extend(fetched)
+                yield vectors, pagination_token
+                ids = []
+
+            if pagination_token is None:
+                return
+
+    def export(self) -> Dict[str, Any]:
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        (self.snapshot_dir / METADATA_DIR).mkdir(exist_ok=True)
+
+        manifest = load_manifest(self.snapshot_dir)
+        if manifest and manifest.get("complete"):
+            print("✓ Snapshot already complete")
+            return manifest
+
+        if manifest is None:
+            stats = self.index.describe_index_stats()
+            manifest = {
+                "format": 1,
+                "dimension": self.dimension,
+                "dtype": self.dtype,
+                "created_at": time.time(),
+                "namespaces": {name: {"expected": summary.vector_count, "rows": 0, "done": False}
+                               for name, summary in stats.namespaces.items()},
+                "rows": 0,
+                "parts": [],
+                "pagination_token": None,
+                "complete": False,
+            }
+        else:
+            print(f"↻ Resuming export at row {manifest['rows']} ({len(manifest['parts'])} parts done)")
+            if manifest["dtype"] != self.dtype:
+                raise ValueError(f"Snapshot was started as {manifest['dtype']}, not {self.dtype}")
+
+        vectors_path = self.snapshot_dir / VECTORS
+        mode = "r+b" if vectors_path.exists() else "w+b"
+        with open(vectors_path, mode) as vectors_file, ThreadPoolExecutor(self.fetch_workers) as pool:
+            # Drop anything written after the last recorded part
+            row_bytes = self.dimension * np.dtype(self.dtype).itemsize
+            vectors_file.truncate(NPY_HEADER_SIZE + manifest["rows"] * row_bytes)
+            write_npy_header(vectors_file, manifest["rows"], self.dimension, self.dtype)
+            vectors_file.seek(0, os.SEEK_END)
+
+            for namespace, info in manifest["namespaces"].items():
+                if info["done"]:
+                    continue
+                print(f"\n📦 Namespace '{namespace or '(default)'}' (~{info['expected']} vectors)")
+
+                for vectors, next_token in self._parts(namespace, manifest["pagination_token"], pool):
+                    if vectors:
+                        self._write_part(manifest, vectors_file, namespace, vectors)
+                        info["rows"] += len(vectors)
+                    manifest["pagination_token"] = next_token
+                    # Same write as the final part, or a resume would list the namespace again
+                    info["done"] = next_token is None
+                    save_manifest(self.snapshot_dir, manifest)
+                    print(f"  {info['rows']} vectors exported...")
+
+        manifest["vectors_sha256"] = file_sha256(vectors_path)
+        manifest["complete"] = True
+        save_manifest(self.snapshot_dir, manifest)
+        return manifest
+
+    def _write_part(self, manifest: Dict[str, Any], vectors_file, namespace: str, vectors: List[Tuple[str, Any]]):
+        part_name = f"part-{len(manifest['parts']):05d}.parquet"
+        part_path = self.snapshot_dir / METADATA_DIR / part_name
+
+        columns, json_keys = encode_metadata([dict(vector.metadata or {}) for _, vector in vectors])
+        columns.pop("id", None)
+        columns.pop("namespace", None)
+        table = pa.table({
+            "id": pa.array([vector_id for vector_id, _ in vectors], pa.string()),
+            "namespace": pa.array([namespace] * len(vectors), pa.string()),
+            **columns,
+        }).replace_schema_metadata({"json_columns": json.dumps(sorted(json_keys))})
+        pq.write_table(table, part_path, compression="zstd")
+
+        matrix = np.asarray([vector.values for _, vector in vectors], dtype=self.dtype)
+        vectors_file.write(matrix.tobytes())
+        vectors_file.flush()
+
+        manifest["rows"] += len(vectors)
+        write_npy_header(vectors_file, manifest["rows"], self.dimension, self.dtype)
+        vectors_file.seek(0, os.SEEK_END)
+        os.fsync(vectors_file.fileno())
+
+        manifest["parts"].append({"file": part_name, "rows": len(vectors), "sha256": file_sha256(part_path)})
+
+
+# === VERIFY ===
+
+def verify_snapshot(snapshot_dir: Path) -> Dict[str, Any]:
+    """Check every file against the manifest checksums and row counts"""
+    manifest = load_manifest(snapshot_dir)
+    if manifest is None or not manifest.get("complete"):
+        raise ValueError(f"{snapshot_dir} is not a complete snapshot")
+
+    if file_sha256(snapshot_dir / VECTORS) != manifest["vectors_sha256"]:
+        raise ValueError("vectors.npy checksum mismatch")
+
+    matrix = np.load(snapshot_dir / VECTORS, mmap_mode="r")
+    if matrix.shape != (manifest["rows"], manifest["dimension"]):
+        raise ValueError(f"vectors.npy shape {matrix.shape} does not match manifest")
+
+    if sum(part["rows"] for part in manifest["parts"]) != manifest["rows"]:
+        raise ValueError("Metadata part row counts do not add up to the manifest's rows")
+
+    for part in manifest["parts"]:
+        part_path = snapshot_dir / METADATA_DIR / part["file"]
+        if file_sha256(part_path) != part["sha256"]:
+            raise ValueError(f"{part['file']} checksum mismatch")
+        if pq.read_metadata(part_path).num_rows != part["rows"]:
+            raise ValueError(f"{part['file']} row count does not match manifest")
+
+    return manifest
+
+
+# === IMPORT ===
+
+class SnapshotImporter:
+    """
+    Upserts a snapshot into any vector backend, in parallel batches
+
+    The backend only needs upsert(vectors=[{"id", "values", "metadata"}], namespace=str),
+    which a Pinecone Index provides. Completed batches are recorded in a
+    progress file per target, so a re-run skips them.
+    """
+
+    def __init__(self, backend, snapshot_dir: Path, target_name: str, batch_size: int = 200,
+                 workers: int = 8):
+        self.backend = backend
+        self.snapshot_dir = snapshot_dir
+        self.batch_size = batch_size
+        self.workers = workers
+        self.progress_path = snapshot_dir / f"import-{target_name}.json"
+        self._lock = threading.Lock()
+
+    def _load_progress(self) -> set:
+        if self.progress_path.exists():
+            return set(json.loads(self.progress_path.read_text())["done"])
+        return set()
+
+    def _mark_done(self, done: set, batch_key: str):
+        with self._lock:
+            done.add(batch_key)
+            tmp = self.progress_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"done": sorted(done)}))
+            os.replace(tmp, self.progress_path)
+
+    def _batches(self, manifest: Dict[str, Any]) -> Iterator[Tuple[str, str, List[Dict[str, Any]]]]:
+        matrix = np.load(self.snapshot_dir / VECTORS, mmap_mode="r")
+        offset = 0
+        for part in manifest["parts"]:
+            table = pq.read_table(self.snapshot_dir / METADATA_DIR / part["file"])
+            json_keys = json.loads((table.schema.metadata or {}).get(b"json_columns", b"[]"))
+            rows = table.to_pylist()
+
+            for start in range(0, len(rows), self.batch_size):
+                batch_rows = rows[start:start + self.batch_size]
+                values = matrix[offset + start:offset + start + len(batch_rows)].astype(np.float32)
+                vectors = [
+                    {"id": row["id"], "values": vector.tolist(), "metadata": decode_metadata(row, json_keys)}
+                    for row, vector in zip(batch_rows, values)
+                ]
+                # A part holds a single namespace
+                yield f"{part['file']}:{start}", batch_rows[0]["namespace"], vectors
+            offset += part["rows"]
+
+    def restore(self) -> int:
+        manifest = verify_snapshot(self.snapshot_dir)
+        done = self._load_progress()
+        if done:
+            print(f"↻ Resuming import, {len(done)} batches already upserted")
+
+        upserted = 0
+        in_flight = {}
+
+        def complete(futures):
+            nonlocal upserted
+            for future in futures:
+                key, count = in_flight.pop(future)
+                future.result()
+                self._mark_done(done, key)
+                upserted += count
+            print(f"  {upserted} vectors restored...")
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            for batch_key, namespace, vectors in self._batches(manifest):
+                if batch_key in done:
+                    continue
+                # Bound memory: never hold more than 2x workers batches
+                if len(in_flight) >= 2 * self.workers:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    complete(finished)
+                future = pool.submit(self.backend.upsert, vectors=vectors, namespace=namespace)
+                in_flight[future] = (batch_key, len(vectors))
+
+            complete(list(in_flight))
+
+        print(f"\n✓ Restored {upserted} vectors ({manifest['rows']} in snapshot)")
+        return upserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or restore an Evolve index snapshot")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = sub.add_parser("export", help="Export the index to a snapshot directory")
+    export_parser.add_argument("directory", type=str)
+    export_parser.add_argument("--dtype", choices=["float32", "float16"], default="float32",
+                               help="Vector precision (float16 halves the size)")
+    export_parser.add_argument("--rows-per-part", type=int, default=5000)
+
+    import_parser = sub.add_parser("import", help="Upsert a snapshot into an index")
+    import_parser.add_argument("directory", type=str)
+    import_parser.add_argument("--index-name", type=str, default=None,
+                               help="Target index (default: PINECONE_INDEX_NAME)")
+    import_parser.add_argument("--batch-size", type=int, default=200)
+    import_parser.add_argument("--workers", type=int, default=8)
+
+    verify_parser = sub.add_parser("verify", help="Check snapshot checksums")
+    verify_parser.add_argument("directory", type=str)
+
+    args = parser.parse_args()
+    snapshot_dir = Path(args.directory)
+
+    if args.command == "verify":
+        manifest = verify_snapshot(snapshot_dir)
+        print(f"✓ Snapshot OK: {manifest['rows']} vectors, {len(manifest['parts'])} parts, {manifest['dtype']}")
+        return
+
+    from pinecone import Pinecone
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+
+    if args.command == "export":
+        index_name = os.getenv("PINECONE_INDEX_NAME", "evolve-consciousness")
+        exporter = SnapshotExporter(
+            pc.Index(index_name),
+            snapshot_dir,
+            dimension=int(os.getenv("PINECONE_DIMENSION", "1536")),
+            dtype=args.dtype,
+            rows_per_part=args.rows_per_part
+        )
+        manifest = exporter.export()
+        print(f"\n✓ Exported {manifest['rows']} vectors from '{index_name}' to {snapshot_dir}")
+    else:
+        index_name = args.index_name or os.getenv("PINECONE_INDEX_NAME", "evolve-consciousness")
+        importer = SnapshotImporter(pc.Index(index_name), snapshot_dir, index_name,
+                                    batch_size=args.batch_size, workers=args.workers)
+        importer.restore()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,11 @@ Comprehensive tagging for consciousness, recovery, mysticism, quantum physics, a
 Updated: November 14, 2025
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import os
+import re
 from anthropic import Anthropic
+from rate_limit import anthropic_governor, estimate_tokens, PRIORITY_BACKGROUND
 
 # Initialize Anthropic client
 def get_anthropic_client():
@@ -18,123 +20,192 @@ def get_anthropic_client():
     return Anthropic(api_key=api_key)
 
 
+# === CHAKRAS & ENERGY CENTERS ===
+CHAKRA_KEYWORDS = {
+    "root": ["survival", "safety", "grounding", "security", "foundation", "muladhara"],
+    "sacral": ["creativity", "sexuality", "emotions", "pleasure", "svadhisthana"],
+    "solar_plexus": ["power", "will", "confidence", "manipura", "self-esteem"],
+    "heart": ["love", "compassion", "forgiveness", "anahata", "connection"],
+    "throat": ["communication", "expression", "truth", "vishuddha", "voice"],
+    "third_eye": ["intuition", "vision", "insight", "ajna", "perception"],
+    "crown": ["consciousness", "enlightenment", "spiritual", "sahasrara", "divine"]
+}
+
+# === ADDICTION & RECOVERY ===
+RECOVERY_KEYWORDS = {
+    "addiction_type": {
+        "alcohol": ["alcohol", "drinking", "sober", "alcoholism"],
+        "drugs": ["drugs", "substance", "narcotics", "opioid"],
+        "codependency": ["codependent", "relationship addiction", "boundaries"]
+    },
+    "recovery_stage": {
+        "early_recovery": ["early recovery", "newcomer", "first 90 days"],
+        "sustained_recovery": ["long-term recovery", "maintenance"],
+        "spiritual_awakening": ["spiritual awakening", "transformation", "rebirth"]
+    },
+    "12_steps": {
+        "step_1": ["powerlessness", "unmanageable", "surrender"],
+        "step_2": ["higher power", "sanity", "restoration"],
+        "step_3": ["decision", "turn over", "will"],
+        "step_4": ["moral inventory", "fearless", "resentments"],
+        "step_11": ["prayer", "meditation", "conscious contact"],
+        "step_12": ["spiritual awakening", "carry message"]
+    }
+}
+
+# === CONSCIOUSNESS LEVELS ===
+CONSCIOUSNESS_KEYWORDS = {
+    "shame": ["shame", "humiliation", "worthless"],
+    "fear": ["fear", "anxiety", "worry"],
+    "courage": ["courage", "affirmation", "empowerment"],
+    "acceptance": ["acceptance", "forgiveness", "harmony"],
+    "love": ["unconditional love", "reverence", "benevolence"],
+    "peace": ["peace", "tranquility", "transcendence"],
+    "enlightenment": ["enlightenment", "pure consciousness"]
+}
+
+# === ESOTERIC TRADITIONS ===
+ESOTERIC_KEYWORDS = {
+    "hermetic": ["hermetic", "hermes", "emerald tablet", "kybalion"],
+    "kabbalah": ["kabbalah", "sephiroth", "tree of life", "zohar"],
+    "sufi": ["sufi", "rumi", "dhikr", "fana"],
+    "vedic": ["vedic", "vedas", "upanishads", "brahman"],
+    "buddhist": ["buddhist", "dharma", "noble truths", "nirvana"],
+    "taoist": ["tao", "yin yang", "wu wei", "i ching"]
+}
+
+# === TEACHERS ===
+TEACHERS_KEYWORDS = {
+    "hawkins": ["david hawkins", "power vs force", "letting go"],
+    "dispenza": ["joe dispenza", "becoming supernatural", "neuroplasticity"],
+    "lipton": ["bruce lipton", "biology of belief", "epigenetics"],
+    "goddard": ["neville goddard", "imagination creates reality"],
+    "murphy": ["joseph murphy", "power of subconscious"],
+    "holmes": ["ernest holmes", "science of mind"]
+}
+
+# === QUANTUM & SCIENCE ===
+QUANTUM_KEYWORDS = {
+    "quantum_physics": ["quantum", "quantum mechanics", "quantum field"],
+    "neuroscience": ["neuroplasticity", "neurotransmitter", "dopamine", "serotonin"],
+    "epigenetics": ["epigenetic", "gene expression", "methylation"],
+    "biofield": ["biofield", "aura", "electromagnetic", "biophoton"]
+}
+
+# === UNIVERSAL LAWS ===
+UNIVERSAL_LAWS_KEYWORDS = {
+    "law_of_attraction": ["law of attraction", "manifestation", "magnetism"],
+    "law_of_vibration": ["vibration", "frequency", "resonance"],
+    "law_of_correspondence": ["as above so below", "microcosm", "macrocosm"],
+    "law_of_cause_effect": ["karma", "cause and effect", "consequences"]
+}
+
+KEYWORD_CATEGORIES = {
+    "chakras": CHAKRA_KEYWORDS,
+    "recovery": RECOVERY_KEYWORDS,
+    "consciousness_level": CONSCIOUSNESS_KEYWORDS,
+    "esoteric_tradition": ESOTERIC_KEYWORDS,
+    "teachers": TEACHERS_KEYWORDS,
+    "quantum_science": QUANTUM_KEYWORDS,
+    "universal_laws": UNIVERSAL_LAWS_KEYWORDS
+}
+
+# Categories specific enough to narrow a search by; chakra and consciousness
+# level keywords ("love", "fear", "power") show up in almost any question
+AUTO_FILTER_CATEGORIES = [
+    category.strip() for category in
+    os.getenv("AUTO_FILTER_CATEGORIES", "recovery,esoteric_tradition,teachers,quantum_science,universal_laws").split(",")
+    if category.strip()
+]
+
+
+def _iter_tag_keywords():
+    """(category, full_tag, tag_name, keywords) for every tag; nested tags are named parent:child"""
+    for category_name, category_dict in KEYWORD_CATEGORIES.items():
+        for tag_name, keywords in category_dict.items():
+            if isinstance(keywords, dict):
+                for sub_tag, sub_keywords in keywords.items():
+                    yield category_name, f"{tag_name}:{sub_tag}", sub_tag, sub_keywords
+            else:
+                yield category_name, tag_name, tag_name, keywords
+
+
+def _word_pattern(phrases: List[str]) -> Optional[re.Pattern]:
+    """One compiled whole-word alternation of phrases"""
+    if not phrases:
+        return None
+    pattern = "|".join(re.escape(phrase) for phrase in sorted(phrases, key=len, reverse=True))
+    return re.compile(rf"\b(?:{pattern})\b")
+
+
+# Flattened once at import rather than rebuilt per chunk
+_TAG_KEYWORDS = [(category, full_tag, keywords) for category, full_tag, _, keywords in _iter_tag_keywords()]
+
+# Question matching is stricter, compiled per tag: whole words only. The tag's
+# own name ("kabbalah", "step 4") and multi-word phrases are strong evidence;
+# single keywords are weak evidence on their own.
+WEAK_MATCH_CONFIDENCE = 0.5  # Per distinct single-word keyword
+WEAK_MAX_CONFIDENCE = 0.9  # Generic words ("decision", "will") never add up to a strong match
+_QUESTION_PATTERNS = [
+    (category, full_tag,
+     _word_pattern([tag_name.replace("_", " ")] + [k for k in keywords if " " in k]),
+     _word_pattern([k for k in keywords if " " not in k]))
+    for category, full_tag, tag_name, keywords in _iter_tag_keywords()
+]
+
+
 def generate_tags_keyword_based(text: str) -> Dict[str, Any]:
     """Generate comprehensive consciousness and recovery tags using keyword matching"""
     tags = []
-    detected_categories = {}
+    detected_categories = {category_name: [] for category_name in KEYWORD_CATEGORIES}
     text_lower = text.lower()
     
-    # === CHAKRAS & ENERGY CENTERS ===
-    chakra_keywords = {
-        "root": ["survival", "safety", "grounding", "security", "foundation", "muladhara"],
-        "sacral": ["creativity", "sexuality", "emotions", "pleasure", "svadhisthana"],
-        "solar_plexus": ["power", "will", "confidence", "manipura", "self-esteem"],
-        "heart": ["love", "compassion", "forgiveness", "anahata", "connection"],
-        "throat": ["communication", "expression", "truth", "vishuddha", "voice"],
-        "third_eye": ["intuition", "vision", "insight", "ajna", "perception"],
-        "crown": ["consciousness", "enlightenment", "spiritual", "sahasrara", "divine"]
-    }
-    
-    # === ADDICTION & RECOVERY ===
-    recovery_keywords = {
-        "addiction_type": {
-            "alcohol": ["alcohol", "drinking", "sober", "alcoholism"],
-            "drugs": ["drugs", "substance", "narcotics", "opioid"],
-            "codependency": ["codependent", "relationship addiction", "boundaries"]
-        },
-        "recovery_stage": {
-            "early_recovery": ["early recovery", "newcomer", "first 90 days"],
-            "sustained_recovery": ["long-term recovery", "maintenance"],
-            "spiritual_awakening": ["spiritual awakening", "transformation", "rebirth"]
-        },
-        "12_steps": {
-            "step_1": ["powerlessness", "unmanageable", "surrender"],
-            "step_2": ["higher power", "sanity", "restoration"],
-            "step_3": ["decision", "turn over", "will"],
-            "step_4": ["moral inventory", "fearless", "resentments"],
-            "step_11": ["prayer", "meditation", "conscious contact"],
-            "step_12": ["spiritual awakening", "carry message"]
-        }
-    }
+    for category_name, full_tag, keywords in _TAG_KEYWORDS:
+        if any(keyword in text_lower for keyword in keywords):
+            detected_categories[category_name].append(full_tag)
+            tags.append(full_tag)
     
-    # === CONSCIOUSNESS LEVELS ===
-    consciousness_keywords = {
-        "shame": ["shame", "humiliation", "worthless"],
-        "fear": ["fear", "anxiety", "worry"],
-        "courage": ["courage", "affirmation", "empowerment"],
-        "acceptance": ["acceptance", "forgiveness", "harmony"],
-        "love": ["unconditional love", "reverence", "benevolence"],
-        "peace": ["peace", "tranquility", "transcendence"],
-        "enlightenment": ["enlightenment", "pure consciousness"]
-    }
-    
-    # === ESOTERIC TRADITIONS ===
-    esoteric_keywords = {
-        "hermetic": ["hermetic", "hermes", "emerald tablet", "kybalion"],
-        "kabbalah": ["kabbalah", "sephiroth", "tree of life", "zohar"],
-        "sufi": ["sufi", "rumi", "dhikr", "fana"],
-        "vedic": ["vedic", "vedas", "upanishads", "brahman"],
-        "buddhist": ["buddhist", "dharma", "noble truths", "nirvana"],
-        "taoist": ["tao", "yin yang", "wu wei", "i ching"]
-    }
-    
-    # === TEACHERS ===
-    teachers_keywords = {
-        "hawkins": ["david hawkins", "power vs force", "letting go"],
-        "dispenza": ["joe dispenza", "becoming supernatural", "neuroplasticity"],
-        "lipton": ["bruce lipton", "biology of belief", "epigenetics"],
-        "goddard": ["neville goddard", "imagination creates reality"],
-        "murphy": ["joseph murphy", "power of subconscious"],
-        "holmes": ["ernest holmes", "science of mind"]
+    return {
+        "tags": list(set(tags)),
+        "detected_categories": detected_categories
     }
+
+
+def question_tags(question: str, categories: Optional[List[str]] = None,
+                  min_confidence: float = 1.0) -> Dict[str, float]:
+    """
+    Tags a question is confidently about, for use as a search pre-filter
     
-    # === QUANTUM & SCIENCE ===
-    quantum_keywords = {
-        "quantum_physics": ["quantum", "quantum mechanics", "quantum field"],
-        "neuroscience": ["neuroplasticity", "neurotransmitter", "dopamine", "serotonin"],
-        "epigenetics": ["epigenetic", "gene expression", "methylation"],
-        "biofield": ["biofield", "aura", "electromagnetic", "biophoton"]
-    }
+    Confidence is 1.0 for a whole-word match of the tag's name or one of its
+    multi-word keywords. Without one, each distinct single-word keyword adds
+    WEAK_MATCH_CONFIDENCE, up to WEAK_MAX_CONFIDENCE, so the default
+    min_confidence only passes strong matches.
     
-    # === UNIVERSAL LAWS ===
-    universal_laws = {
-        "law_of_attraction": ["law of attraction", "manifestation", "magnetism"],
-        "law_of_vibration": ["vibration", "frequency", "resonance"],
-        "law_of_correspondence": ["as above so below", "microcosm", "macrocosm"],
-        "law_of_cause_effect": ["karma", "cause and effect", "consequences"]
-    }
+    Args:
+        question: Question text
+        categories: Categories to consider (default AUTO_FILTER_CATEGORIES)
+        min_confidence: Drop tags scoring below this
     
-    # Process all categories
-    all_categories = {
-        "chakras": chakra_keywords,
-        "recovery": recovery_keywords,
-        "consciousness_level": consciousness_keywords,
-        "esoteric_tradition": esoteric_keywords,
-        "teachers": teachers_keywords,
-        "quantum_science": quantum_keywords,
-        "universal_laws": universal_laws
-    }
+    Returns:
+        Dictionary of full tag -> confidence
+    """
+    categories = AUTO_FILTER_CATEGORIES if categories is None else categories
+    question_lower = question.lower()
+    found = {}
     
-    for category_name, category_dict in all_categories.items():
-        detected_categories[category_name] = []
-        for tag_name, keywords in category_dict.items():
-            if isinstance(keywords, dict):
-                # Handle nested dictionaries
-                for sub_tag, sub_keywords in keywords.items():
-                    if any(keyword in text_lower for keyword in sub_keywords):
-                        full_tag = f"{tag_name}:{sub_tag}"
-                        detected_categories[category_name].append(full_tag)
-                        tags.append(full_tag)
-            else:
-                # Handle simple keyword lists
-                if any(keyword in text_lower for keyword in keywords):
-                    detected_categories[category_name].append(tag_name)
-                    tags.append(tag_name)
+    for category_name, full_tag, strong, weak in _QUESTION_PATTERNS:
+        if category_name not in categories:
+            continue
+        if strong is not None and strong.search(question_lower):
+            confidence = 1.0
+        elif weak is not None:
+            confidence = min(WEAK_MATCH_CONFIDENCE * len(set(weak.findall(question_lower))), WEAK_MAX_CONFIDENCE)
+        else:
+            confidence = 0.0
+        if confidence > 0 and confidence >= min_confidence:
+            found[full_tag] = confidence
     
-    return {
-        "tags": list(set(tags)),
-        "detected_categories": detected_categories
-    }
+    return found
 
 
 def generate_tags_ai_enhanced(text: str, max_tokens: int = 500) -> Dict[str, Any]:
@@ -165,11 +236,14 @@ Return ONLY a JSON object:
 
     try:
         client = get_anthropic_client()
+        reserved = estimate_tokens(prompt) + max_tokens
+        anthropic_governor.acquire(tokens=reserved, priority=PRIORITY_BACKGROUND)
         message = client.messages.create(
             model=os.getenv("CLAUDE_MODEL", "claude-sonnet-4-5-20250929"),
             max_tokens=max_tokens,
             messages=[{"role": "user", "content": prompt}]
         )
+        anthropic_governor.settle(reserved, message.usage.input_tokens + message.usage.output_tokens)
         
         import json
         response_text = message.content[0].text
@@ -186,19 +260,21 @@ Return ONLY a JSON object:
         return generate_tags_keyword_based(text)
 
 
-def generate_tags(text: str, use_ai: bool = False) -> Dict[str, Any]:
+def generate_tags(text: str, use_ai: bool = False, keyword_tags: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Main tagging function combining keyword and AI tagging
     
     Args:
         text: Text to analyze
         use_ai: Use AI enhancement (default: False for speed)
+        keyword_tags: Keyword tags already computed elsewhere (e.g. in a worker process)
     
     Returns:
         Dictionary with tags and metadata
     """
     # Always get keyword tags
-    keyword_tags = generate_tags_keyword_based(text)
+    if keyword_tags is None:
+        keyword_tags = generate_tags_keyword_based(text)
     
     if use_ai:
         try:
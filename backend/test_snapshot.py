@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Round-trip test for snapshot export/import against an in-memory index
+Run with: python test_snapshot.py (or pytest)
+"""
+
+import json
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import snapshot
+from snapshot import SnapshotExporter, SnapshotImporter, verify_snapshot
+
+DIMENSION = 4
+
+
+class FakeIndex:
+    """Just enough of a Pinecone Index for export and import"""
+
+    def __init__(self, namespaces=None):
+        self.namespaces = namespaces or {}
+
+    def describe_index_stats(self):
+        return SimpleNamespace(namespaces={
+            name: SimpleNamespace(vector_count=len(vectors)) for name, vectors in self.namespaces.items()
+        })
+
+    def list_paginated(self, namespace, limit, pagination_token=None):
+        ids = sorted(self.namespaces[namespace])
+        start = int(pagination_token or 0)
+        end = start + limit
+        return SimpleNamespace(
+            vectors=[SimpleNamespace(id=vector_id) for vector_id in ids[start:end]],
+            pagination=SimpleNamespace(next=str(end)) if end < len(ids) else None
+        )
+
+    def fetch(self, ids, namespace):
+        stored = self.namespaces[namespace]
+        return SimpleNamespace(vectors={
+            vector_id: SimpleNamespace(values=stored[vector_id]["values"], metadata=stored[vector_id]["metadata"])
+            for vector_id in ids if vector_id in stored
+        })
+
+    def upsert(self, vectors, namespace=""):
+        for vector in vectors:
+            self.namespaces.setdefault(namespace, {})[vector["id"]] = {
+                "values": vector["values"], "metadata": vector["metadata"]
+            }
+
+
+def sample_index():
+    """Vectors whose metadata keys differ from row to row, as they do after streamed and tenant uploads"""
+    return FakeIndex({
+        "beginner": {
+            "Doc_0": {"values": [0.1, 0.2, 0.3, 0.4], "metadata": {
+                "text": "First chunk", "title": "Doc", "chunk_index": 0, "total_chunks": 2,
+                "tags": ["kabbalah"]
+            }},
+            "Doc_1": {"values": [0.5, 0.6, 0.7, 0.8], "metadata": {
+                "text": "Second chunk", "title": "Doc", "chunk_index": 1, "tags": [],
+                "content_hash": "abc123", "duplicate_of": "Other_0",
+                "detected_categories": {"esoteric_tradition": ["kabbalah"]}
+            }},
+        },
+        "acme:advanced": {
+            "Acme_0": {"values": [1.0, 0.0, 0.0, 0.0], "metadata": {
+                "text": "Tenant chunk", "title": "Acme", "tenant": "acme", "score_hint": 3
+            }},
+            "Acme_1": {"values": [0.0, 1.0, 0.0, 0.0], "metadata": {
+                "text": "Tenant chunk 2", "title": "Acme", "score_hint": "high"
+            }},
+        },
+    })
+
+
+def test_round_trip_keeps_sparse_metadata():
+    source = sample_index()
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_dir = Path(tmp)
+        manifest = SnapshotExporter(source, snapshot_dir, DIMENSION, rows_per_part=2).export()
+        assert manifest["rows"] == 4
+        verify_snapshot(snapshot_dir)
+
+        target = FakeIndex()
+        assert SnapshotImporter(target, snapshot_dir, "test", batch_size=1, workers=2).restore() == 4
+
+    assert target.namespaces.keys() == source.namespaces.keys()
+    for namespace, vectors in source.namespaces.items():
+        for vector_id, vector in vectors.items():
+            restored = target.namespaces[namespace][vector_id]
+            assert restored["metadata"] == vector["metadata"], vector_id
+            # Stored as float32
+            assert all(abs(a - b) < 1e-6 for a, b in zip(restored["values"], vector["values"]))
+
+
+def test_verify_rejects_row_count_mismatch():
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_dir = Path(tmp)
+        SnapshotExporter(sample_index(), snapshot_dir, DIMENSION, rows_per_part=2).export()
+
+        manifest_path = snapshot_dir / "manifest.json"
+        manifest = json.loads(manifest_path.read_text())
+        manifest["parts"][0]["rows"] -= 1
+        manifest_path.write_text(json.dumps(manifest))
+        try:
+            verify_snapshot(snapshot_dir)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("verify_snapshot accepted a manifest whose part rows don't add up")
+
+
+def test_resume_after_crash_exports_each_vector_once():
+    save_manifest = snapshot.save_manifest
+    crash_after = 1
+    while True:
+        saves = 0
+
+        def crashing_save(snapshot_dir, manifest):
+            nonlocal saves
+            save_manifest(snapshot_dir, manifest)
+            saves += 1
+            if saves == crash_after:
+                raise KeyboardInterrupt
+
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot_dir = Path(tmp)
+            snapshot.save_manifest = crashing_save
+            try:
+                SnapshotExporter(sample_index(), snapshot_dir, DIMENSION, rows_per_part=1).export()
+                finished = True
+            except KeyboardInterrupt:
+                finished = False
+            finally:
+                snapshot.save_manifest = save_manifest
+            if finished:
+                return
+
+            manifest = SnapshotExporter(sample_index(), snapshot_dir, DIMENSION, rows_per_part=1).export()
+            assert manifest["rows"] == 4, f"crash after save {crash_after}: {manifest['rows']} rows"
+            verify_snapshot(snapshot_dir)
+        crash_after += 1
+
+
+if __name__ == "__main__":
+    test_round_trip_keeps_sparse_metadata()
+    test_verify_rejects_row_count_mismatch()
+    test_resume_after_crash_exports_each_vector_once()
+    print("✓ Snapshot round-trip tests passed")
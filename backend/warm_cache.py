@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Evolve Consciousness Engine - Answer Cache Warming
+Precompute answers for your most popular questions so /query serves them instantly
+"""
+
+import argparse
+from pathlib import Path
+
+import requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the Evolve answer cache from a question list")
+    parser.add_argument("questions", type=str, help="Text file with one question per line")
+    parser.add_argument("--level", type=str, action="append",
+                       choices=["beginner", "intermediate", "advanced"],
+                       help="Program level to warm (repeatable, default: all)")
+    parser.add_argument("--tenant", type=str, default=None,
+                       help="Tenant whose namespaces the answers come from")
+    parser.add_argument("--api-url", type=str, default="http://localhost:8000",
+                       help="API URL (default: http://localhost:8000)")
+
+    args = parser.parse_args()
+
+    path = Path(args.questions)
+    if not path.exists():
+        print(f"❌ Error: Question file not found: {path}")
+        return
+
+    questions = [line.strip() for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+    if not questions:
+        print("❌ Error: No questions found")
+        return
+
+    try:
+        response = requests.post(f"{args.api_url}/cache/warm", json={
+            "questions": questions,
+            "program_levels": args.level,
+            "tenant": args.tenant
+        }, timeout=30)
+    except Exception as e:
+        print(f"❌ Error: Cannot connect to API at {args.api_url}: {e}")
+        return
+
+    if response.status_code != 200:
+        print(f"❌ Error: {response.status_code} {response.text}")
+        return
+
+    result = response.json()
+    print(f"✓ Scheduled {result['answers_scheduled']} answers "
+          f"({result['questions']} questions × {len(result['program_levels'])} levels)")
+    print(f"  Track progress: curl {args.api_url}/cache/stats")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Evolve Consciousness Engine - CPU Work Executor
+Process pool for tokenization, keyword tagging and MinHashing, kept off the event loop
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from chunking import get_encoding, split_for_workers
+from dedup import minhash_signature
+from tagging import generate_tags_keyword_based
+
+logger = logging.getLogger(__name__)
+
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Below this many characters a document is encoded by a single worker
+PARALLEL_ENCODE_MIN_CHARS = int(os.getenv("PARALLEL_ENCODE_MIN_CHARS", "200000"))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+# === WORKER FUNCTIONS (run in child processes) ===
+
+def _init_worker():
+    """Load the tiktoken encoding once per worker instead of per task"""
+    get_encoding()
+
+
+def encode_text(text: str) -> List[int]:
+    """Tokenize a piece of text"""
+    return get_encoding().encode(text)
+
+
+def decode_and_tag(token_slices: List[List[int]], with_signatures: bool = False
+                   ) -> Tuple[List[str], List[Dict[str, Any]], Optional[List[Any]]]:
+    """Decode a batch of chunk token slices, keyword-tag each chunk and optionally MinHash it"""
+    encoding = get_encoding()
+    chunks = [encoding.decode(tokens) for tokens in token_slices]
+    signatures = [minhash_signature(chunk) for chunk in chunks] if with_signatures else None
+    return chunks, [generate_tags_keyword_based(chunk) for chunk in chunks], signatures
+
+
+# === EXECUTOR ===
+
+def get_cpu_executor() -> ProcessPoolExecutor:
+    """Shared process pool, created on first use"""
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that already runs threadpool workers can deadlock on held locks
+        _executor = ProcessPoolExecutor(
+            max_workers=CPU_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        logger.info(f"Started CPU executor with {CPU_WORKERS} workers")
+    return _executor
+
+
+def shutdown_cpu_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def run_cpu(func: Callable, *args) -> "asyncio.Future":
+    """Submit func(*args) to the process pool, returning an awaitable future"""
+    return asyncio.get_running_loop().run_in_executor(get_cpu_executor(), func, *args)
+
+
+async def encode_parallel(text: str) -> List[int]:
+    """Tokenize a document, splitting large ones across every worker"""
+    parts = CPU_WORKERS if len(text) >= PARALLEL_ENCODE_MIN_CHARS else 1
+    results = await asyncio.gather(*(run_cpu(encode_text, segment) for segment in split_for_workers(text, parts)))
+
+    tokens = []
+    for segment_tokens in results:
+        tokens.extend(segment_tokens)
+    return tokens